@@ -4,6 +4,9 @@ See also https://github.com/cutonbuminband/rcounting/blob/main/doc/examples.org
 for examples of working with the data.
 """
 
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
@@ -16,19 +19,96 @@ from rcounting import counters, utils
 from rcounting.counters.counters import is_banned_counter
 from rcounting.units import DAY
 
+printer = logging.getLogger(__name__)
 
-def load_csvs(start, n, directory="."):
-    """Load n csv files into a single dataframe"""
-    results = []
-    for _ in range(n):
-        path = Path(directory) / Path(f"{start}.csv")
-        df = pd.read_csv(path, comment="#")
-        if len(df) % 1000 != 0:
-            print(path)
-        df = df.set_index("comment_id")
-        results.append(df)
-        start += 1000
-    return pd.concat(results)
+
+def read_csv(path, strict=False):
+    """
+    Read one csv file of logged counts with compact dtypes: usernames are
+    categorical and timestamps are integers.
+
+    Each file should hold a multiple of 1000 counts, with a timestamp for
+    every count. Files that don't are reported, or rejected with a ValueError
+    if `strict` is set. Missing timestamps are kept as missing values, using
+    pandas' nullable integer type.
+    """
+    df = pd.read_csv(path, comment="#", dtype={"username": "category"})
+    problems = []
+    if len(df) % 1000 != 0:
+        problems.append(f"{len(df)} rows, which is not a multiple of 1000")
+    missing_timestamps = df["timestamp"].isna().sum()
+    if missing_timestamps:
+        problems.append(f"{missing_timestamps} rows without a timestamp")
+    for problem in problems:
+        if strict:
+            raise ValueError(f"{path} contains {problem}")
+        printer.warning("%s contains %s", path, problem)
+    df["timestamp"] = df["timestamp"].astype("Int64" if missing_timestamps else "int64")
+    return df.set_index("comment_id")
+
+
+def iter_csvs(start, n, directory=".", files_per_chunk=10, workers=None, strict=False):
+    """
+    Read n csv files and yield them as a series of dataframes, each made
+    from `files_per_chunk` consecutive files.
+
+    Each chunk is read by a pool of `workers` threads, and only one chunk is
+    held in memory at a time, so this can be used to aggregate data that
+    doesn't fit in memory. The username categories differ between chunks.
+
+    The analysis functions in this module and in `plots` only report the
+    usernames that occur in the data they're given, so they give the same
+    results for categorical usernames as for plain strings.
+    """
+    paths = [Path(directory) / f"{start + 1000 * i}.csv" for i in range(n)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for chunk in utils.chunked(paths, files_per_chunk):
+            yield _concat(list(executor.map(functools.partial(read_csv, strict=strict), chunk)))
+
+
+def load_csvs(start, n, directory=".", workers=None, strict=False):
+    """Load n csv files into a single dataframe, reading them in parallel"""
+    paths = [Path(directory) / f"{start + 1000 * i}.csv" for i in range(n)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return _concat(list(executor.map(functools.partial(read_csv, strict=strict), paths)))
+
+
+def _concat(frames):
+    """
+    Concatenate dataframes with categorical usernames. Giving every frame
+    the same categories first keeps the result categorical; otherwise pandas
+    would fall back to plain strings.
+    """
+    categories = pd.api.types.union_categoricals(
+        [x["username"] for x in frames], ignore_order=True
+    ).categories
+    for frame in frames:
+        frame["username"] = frame["username"].cat.set_categories(categories)
+    return pd.concat(frames)
+
+
+def load_parquet(directory, table="comments", columns=None, thread_ids=None, years=None):
+    """
+    Load a table exported with `rcounting export` into a dataframe.
+
+    Only the requested columns are read, and only the partitions belonging to
+    the threads in `thread_ids` and the years in `years`. The main thread has
+    the thread id "main". Usernames are loaded as a categorical column.
+    """
+    import pyarrow.dataset as ds
+
+    from rcounting.io import parquet_partitioning
+
+    dataset = ds.dataset(
+        Path(directory) / table, format="parquet", partitioning=parquet_partitioning()
+    )
+    expression = None
+    for field, values in [("thread_id", thread_ids), ("year", years)]:
+        if values is None:
+            continue
+        condition = ds.field(field).isin(list(values))
+        expression = condition if expression is None else expression & condition
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
 
 
 def hoc_string(df, title):
@@ -42,7 +122,7 @@ def hoc_string(df, title):
         username = counters.apply_alias(username)
         return f"**/u/{username}**" if username == getter else f"/u/{username}"
 
-    df["hoc_username"] = df["username"].apply(hoc_format)
+    df["hoc_username"] = df["username"].astype(object).apply(hoc_format)
     dt = pd.to_timedelta(df.iloc[-1].timestamp - df.iloc[0].timestamp, unit="s")
     table = df.iloc[1:]["hoc_username"].value_counts().to_frame().reset_index()
     data = table.set_index(table.index + 1).to_csv(None, sep="|", header=0)
@@ -61,12 +141,12 @@ def response_graph(df, n=250, username_column="username"):
     Create a directed edge a->b in the graph if a has ever replied to b.
     Weight each edge by the number of replies
     """
-    indices = df.groupby(username_column).size().sort_values(ascending=False).index
+    indices = df.groupby(username_column, observed=True).size().sort_values(ascending=False).index
     indices = [x for x in indices if not is_banned_counter(x)][:n]
     edges = df[username_column].isin(indices) & df[username_column].shift(1).isin(indices)
     top = pd.concat([df[username_column], df[username_column].shift()], axis=1).loc[edges]
     top.columns = ["username", "replying_to"]
-    graph = top.groupby(["username", "replying_to"], as_index=False).size()
+    graph = top.groupby(["username", "replying_to"], as_index=False, observed=True).size()
     graph.columns = ["Source", "Target", "Weight"]
     return graph
 
@@ -90,7 +170,7 @@ def effective_number_of_counters(c):
 def capture_the_flag_score(submission):
     """Calculate how long each user has had the latest count"""
     submission["score"] = submission["timestamp"].diff().shift(-1)
-    return submission.groupby("username")["score"].sum()
+    return submission.groupby("username", observed=True)["score"].sum()
 
 
 def vonmises_distribution(x, mu=0, kappa=1):
@@ -152,12 +232,12 @@ def fft_kde(data, n_bins, kernel=vonmises_distribution, **params):
 
 
 def even_odd_counts(df, n=50):
-    indices = df.groupby("username").size().sort_values(ascending=False).index
+    indices = df.groupby("username", observed=True).size().sort_values(ascending=False).index
     top_counters = [x for x in indices if not counters.is_banned_counter(x)][:n]  # noqa: F841
     df["is_even"] = df["position"] % 2 == 0
     df["is_odd"] = 1 - df["is_even"]
     subset = df.query("username in @top_counters")
-    table = subset[["username", "is_even", "is_odd"]].groupby("username").sum()
+    table = subset[["username", "is_even", "is_odd"]].groupby("username", observed=True).sum()
     table.columns = ["n_even", "n_odd"]
     table["difference"] = table["n_odd"] - table["n_even"]
     table["relative_difference"] = table["difference"] / (table["n_even"] + table["n_odd"]) * 100
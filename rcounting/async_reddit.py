@@ -0,0 +1,95 @@
+"""
+Concurrent access to the reddit api.
+
+praw is synchronous, so every call blocks until reddit has answered, and
+expanding a comment tree one request at a time spends almost all of its time
+waiting. This module runs the blocking praw calls in worker threads and lets
+asyncio schedule many of them at once. A semaphore shared by every call made
+through the same client acts as the budget for how many requests can be in
+flight at the same time, while the shared rate limiter decides how fast
+they're sent.
+
+Only the network calls run in the worker threads; everything that touches a
+comment tree or the comment cache is done by the caller in the event loop
+thread.
+"""
+
+import asyncio
+import concurrent.futures
+
+from praw.models import MoreComments
+
+from rcounting import rate_limit, utils
+
+DEFAULT_CONCURRENCY = 4
+
+
+class AsyncReddit:
+    """Schedule blocking calls to a praw reddit instance concurrently"""
+
+    def __init__(self, reddit, concurrency=DEFAULT_CONCURRENCY):
+        self.reddit = reddit
+        self.concurrency = concurrency
+        self._semaphore = None
+
+    @property
+    def semaphore(self):
+        # The semaphore has to be created inside the event loop that uses it
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def call(self, function, *args, **kwargs):
+        """Run `function` in a worker thread once there's room in the budget"""
+        async with self.semaphore:
+            return await asyncio.to_thread(rate_limit.retry, function, *args, **kwargs)
+
+    async def map(self, function, *iterables):
+        """Call `function` on each set of arguments concurrently, keeping the order"""
+        return await asyncio.gather(*[self.call(function, *args) for args in zip(*iterables)])
+
+    async def find_all_replies(self, comment):
+        """
+        Return a list of all replies to a comment, with each `MoreComments`
+        instance expanded.
+
+        This does the same as `models.find_all_replies` without a limit, except
+        that all the `MoreComments` found at each stage are expanded at the same
+        time. The replies are therefore in a different order.
+        """
+        submission = comment.submission
+        replies = []
+        pending = comment.replies.list()
+        while pending:
+            more_comments = [x for x in pending if isinstance(x, MoreComments)]
+            replies += [x for x in pending if not isinstance(x, MoreComments)]
+            for item in more_comments:
+                if item.submission is None:
+                    item.submission = submission
+            pending = utils.flatten(await self.map(expand_more_comments, more_comments))
+        return replies
+
+
+def expand_more_comments(more_comments):
+    return more_comments.comments(update=False).list()
+
+
+def run(coroutine_function, reddit, *args, concurrency=DEFAULT_CONCURRENCY, **kwargs):
+    """
+    Run `coroutine_function(client, *args, **kwargs)` to completion with a fresh
+    client, and return the result.
+
+    This is the bridge that lets synchronous code use the concurrent versions
+    of the tree methods. If it's called from a thread that already has a
+    running event loop, such as a jupyter notebook, asyncio won't start a
+    second one there, so the coroutine gets its own loop in a worker thread
+    and the caller waits for it to finish.
+    """
+    client = AsyncReddit(reddit, concurrency)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine_function(client, *args, **kwargs))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(asyncio.run, coroutine_function(client, *args, **kwargs))
+        return future.result()
@@ -0,0 +1,310 @@
+"""
+A persistent on-disk cache of reddit comments, shared between all the rcounting commands.
+
+Counting comments are effectively immutable once they've been made, and
+completely immutable once the submission they belong to has been archived. The
+cache takes advantage of that to avoid downloading the same comments again on
+every run:
+
+- Comments fetched after their submission was archived never expire
+- Other comments are considered fresh for `COMMENT_TTL` seconds
+- The list of replies to a comment is only trusted if every reply was fetched,
+  and then only for `REPLIES_TTL` seconds, unless the replies were fetched
+  after the submission was archived.
+
+Reddit archives submissions six months after they're made, and a comment is
+never older than its submission, so a comment made more than `ARCHIVE_AGE`
+seconds before it was fetched is guaranteed to belong to an archived submission.
+
+The cache also stores the link from each submission to the previous submission
+in its thread, as found by `thread_navigation.find_previous_submission`. A link
+to a specific get is trusted indefinitely, while a link to just a submission,
+or the absence of a link, is only trusted for `LINK_TTL` seconds unless the
+submission has been archived, since a better link can still be posted.
+
+Finally, the cache stores what each reddit.com/r/counting/s/... short link
+resolves to. Short links never change, so these entries never expire.
+
+The cache lives in an sqlite database whose location can be set with the
+`rcounting_cache` environment variable. Setting it to an empty string disables
+the cache.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from rcounting import utils
+from rcounting.units import DAY, HOUR, MINUTE
+
+printer = logging.getLogger(__name__)
+
+ARCHIVE_AGE = 180 * DAY
+COMMENT_TTL = DAY
+REPLIES_TTL = 5 * MINUTE
+LINK_TTL = HOUR
+
+_columns = [
+    "comment_id",
+    "submission_id",
+    "parent_id",
+    "is_root",
+    "username",
+    "timestamp",
+    "body",
+    "removed",
+    "fetched_at",
+]
+
+
+class CachedComment:
+    """A comment loaded from the cache, with the same attributes as a praw comment"""
+
+    __slots__ = (
+        "id",
+        "link_id",
+        "parent_id",
+        "is_root",
+        "author",
+        "created_utc",
+        "body",
+        "removed",
+    )
+
+    def __init__(self, row):
+        self.id = row["comment_id"]
+        self.link_id = "t3_" + row["submission_id"]
+        self.parent_id = row["parent_id"]
+        self.is_root = bool(row["is_root"])
+        self.author = row["username"]
+        self.created_utc = row["timestamp"]
+        self.body = row["body"]
+        self.removed = bool(row["removed"])
+
+
+def is_settled(timestamp, fetched_at):
+    """Whether the comment was fetched after its submission must have been archived"""
+    return fetched_at - timestamp > ARCHIVE_AGE
+
+
+class CommentCache:
+    """Store and retrieve comments by id, along with the structure of the comment tree"""
+
+    def __init__(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # The cache is shared by the worker threads that update directory rows,
+        # so the connection may be used from any thread, one query at a time.
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self.db.row_factory = sqlite3.Row
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS comments ("
+                "comment_id TEXT PRIMARY KEY, submission_id TEXT, parent_id TEXT, "
+                "is_root INTEGER, username TEXT, timestamp REAL, body TEXT, "
+                "removed INTEGER, fetched_at REAL, replies_fetched_at REAL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS parent_idx ON comments (parent_id)")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS submission_links ("
+                "submission_id TEXT PRIMARY KEY, previous_submission_id TEXT, "
+                "previous_get_id TEXT, title TEXT, timestamp REAL, evidence TEXT, "
+                "fetched_at REAL)"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS short_links ("
+                "url TEXT PRIMARY KEY, submission_id TEXT, comment_id TEXT)"
+            )
+
+    def is_fresh(self, row, now=None):
+        now = time.time() if now is None else now
+        return is_settled(row["timestamp"], row["fetched_at"]) or (
+            now - row["fetched_at"] < COMMENT_TTL
+        )
+
+    def has_replies(self, row, now=None):
+        """Whether the cached replies of the comment in `row` are complete and fresh"""
+        now = time.time() if now is None else now
+        fetched_at = row["replies_fetched_at"]
+        if fetched_at is None:
+            return False
+        return is_settled(row["timestamp"], fetched_at) or (now - fetched_at < REPLIES_TTL)
+
+    def _query(self, query, parameters):
+        with self._lock:
+            return self.db.execute(query, parameters).fetchall()
+
+    def _row(self, comment_id):
+        rows = self._query("SELECT * FROM comments WHERE comment_id = ?", (comment_id,))
+        return rows[0] if rows else None
+
+    def get(self, comment_id):
+        row = self._row(comment_id)
+        if row is None or not self.is_fresh(row):
+            return None
+        return CachedComment(row)
+
+    def get_ancestors(self, comment_id):
+        """
+        Return the comment with id `comment_id` followed by as many of its
+        ancestors as are present in the cache, stopping at the first one that
+        is missing or stale.
+        """
+        rows = self._query(
+            "WITH RECURSIVE chain(comment_id, parent_id, is_root, depth) AS ("
+            "SELECT comment_id, parent_id, is_root, 0 FROM comments WHERE comment_id = ? "
+            "UNION ALL "
+            "SELECT c.comment_id, c.parent_id, c.is_root, chain.depth + 1 FROM comments c "
+            "JOIN chain ON c.comment_id = substr(chain.parent_id, 4) WHERE NOT chain.is_root) "
+            "SELECT comments.* FROM chain JOIN comments USING (comment_id) ORDER BY depth",
+            (comment_id,),
+        )
+        now = time.time()
+        result = []
+        for row in rows:
+            if not self.is_fresh(row, now):
+                break
+            result.append(CachedComment(row))
+        return result
+
+    def get_replies(self, comment_id):
+        """
+        Return every cached descendant of `comment_id`, or None if the cache
+        can't vouch for the replies being complete.
+        """
+        row = self._row(comment_id)
+        if row is None or not self.has_replies(row):
+            return None
+        rows = self._query(
+            "WITH RECURSIVE subtree(comment_id) AS ("
+            "SELECT comment_id FROM comments WHERE parent_id = 't1_' || ? "
+            "UNION ALL "
+            "SELECT c.comment_id FROM comments c "
+            "JOIN subtree ON c.parent_id = 't1_' || subtree.comment_id) "
+            "SELECT comments.* FROM subtree JOIN comments USING (comment_id) "
+            "ORDER BY timestamp",
+            (comment_id,),
+        )
+        return [CachedComment(x) for x in rows]
+
+    def add(self, comments, complete_replies=False):
+        """
+        Store `comments` in the cache.
+
+        If `complete_replies` is set, the caller guarantees that the replies
+        to every comment in `comments` are also present in `comments`.
+        """
+        now = time.time()
+        rows = [
+            (
+                x.id,
+                x.link_id[3:],
+                x.parent_id,
+                bool(x.is_root),
+                str(x.author),
+                x.created_utc,
+                x.body,
+                bool(getattr(x, "removed", False)),
+                now,
+                now if complete_replies else None,
+            )
+            for x in comments
+        ]
+        with self._lock, self.db:
+            self.db.executemany(
+                f"INSERT INTO comments ({', '.join(_columns)}, replies_fetched_at) "
+                f"VALUES ({', '.join('?' * (len(_columns) + 1))}) "
+                "ON CONFLICT (comment_id) DO UPDATE SET "
+                + ", ".join(f"{x} = excluded.{x}" for x in _columns[1:])
+                + ", replies_fetched_at = "
+                "coalesce(excluded.replies_fetched_at, replies_fetched_at)",
+                rows,
+            )
+
+    def get_link(self, submission_id):
+        """
+        Return the cached (previous_submission_id, previous_get_id) link of a
+        submission, or None if there isn't a trustworthy one.
+        """
+        rows = self._query(
+            "SELECT * FROM submission_links WHERE submission_id = ?", (submission_id,)
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        is_fresh = (
+            row["previous_get_id"] is not None
+            or is_settled(row["timestamp"], row["fetched_at"])
+            or time.time() - row["fetched_at"] < LINK_TTL
+        )
+        if not is_fresh:
+            return None
+        return row["previous_submission_id"], row["previous_get_id"]
+
+    def add_link(self, submission, link, evidence):
+        """
+        Store the link from `submission` to the previous submission, along with
+        the evidence it was chosen from: a list of the candidate links and how
+        similar the titles of their submissions were to that of `submission`.
+        """
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO submission_links (submission_id, "
+                "previous_submission_id, previous_get_id, title, timestamp, evidence, "
+                "fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    submission.id,
+                    *link,
+                    submission.title,
+                    submission.created_utc,
+                    json.dumps(evidence),
+                    time.time(),
+                ),
+            )
+
+    def get_short_links(self, urls):
+        """Return a dictionary url -> (submission_id, comment_id) for the cached short links"""
+        result = {}
+        for chunk in utils.chunked(list(urls), 500):
+            chunk = list(chunk)
+            rows = self._query(
+                f"SELECT * FROM short_links WHERE url IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            result |= {x["url"]: (x["submission_id"], x["comment_id"]) for x in rows}
+        return result
+
+    def add_short_links(self, links):
+        """Store a dictionary url -> (submission_id, comment_id) of resolved short links"""
+        with self._lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO short_links (url, submission_id, comment_id) "
+                "VALUES (?, ?, ?)",
+                [(url, *link) for url, link in links.items()],
+            )
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    """
+    Return the cache shared by all commands, opening it on first use.
+
+    Returns None if the cache has been disabled.
+    """
+    global _default_cache  # pylint: disable=global-statement
+    with _default_cache_lock:
+        if _default_cache is None:
+            cache_home = Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache"))
+            path = os.getenv("rcounting_cache", cache_home / "rcounting" / "comments.sqlite")
+            if not path:
+                return None
+            printer.debug("Using comment cache at %s", path)
+            _default_cache = CommentCache(path)
+    return _default_cache
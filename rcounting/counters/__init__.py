@@ -1,7 +1,11 @@
 from .counters import (
     apply_alias,
+    apply_aliases,
+    banned_counters,
     is_banned_counter,
     is_ignored_counter,
     is_mod,
+    mods,
+    rules_hash,
     update_aliases,
 )
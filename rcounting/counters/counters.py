@@ -1,3 +1,4 @@
+import hashlib
 import logging
 import os
 from collections import defaultdict
@@ -127,6 +128,14 @@ def apply_alias(username):
     return _alias_dict[username.lower()] if username.lower() in _alias_dict else username
 
 
+def apply_aliases(usernames):
+    """Apply `apply_alias` to every element of a pandas Series of usernames at once"""
+    if hasattr(usernames, "cat"):
+        # Categorical usernames only need each category to be mapped
+        return usernames.map({x: apply_alias(x) for x in usernames.cat.categories})
+    return usernames.str.lower().map(_alias_dict).fillna(usernames)
+
+
 mods = [
     "Z3F",
     "949paintball",
@@ -165,3 +174,14 @@ def is_ignored_counter(username):
 
 def is_banned_counter(username):
     return username in banned_counters
+
+
+def rules_hash():
+    """
+    A fingerprint of the aliases and the lists of mods and banned counters.
+
+    It changes whenever any of them do, which tells cached tables derived from
+    them that they need to be recomputed.
+    """
+    contents = repr((sorted(_alias_dict.items()), sorted(mods), sorted(banned_counters)))
+    return hashlib.sha256(contents.encode("utf8")).hexdigest()
@@ -1,4 +1,5 @@
 import logging
+import shutil
 import sqlite3
 from pathlib import Path
 
@@ -8,65 +9,260 @@ from rcounting import counters, models, parsing
 
 printer = logging.getLogger(__name__)
 
+COMMENT_COLUMNS = ["position", "username", "timestamp", "comment_id", "submission_id", "body"]
+SUBMISSION_COLUMNS = ["submission_id", "username", "timestamp", "title", "body"]
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS comments ("
+    "position INTEGER, username TEXT, timestamp REAL, "
+    "comment_id TEXT PRIMARY KEY, submission_id TEXT, body TEXT)",
+    "CREATE INDEX IF NOT EXISTS comments_submission_idx ON comments (submission_id)",
+    "CREATE INDEX IF NOT EXISTS comments_timestamp_idx ON comments (timestamp)",
+    "CREATE TABLE IF NOT EXISTS submissions ("
+    "submission_id TEXT PRIMARY KEY, username TEXT, timestamp REAL, "
+    "title TEXT, body TEXT, {extra_column})",
+    "CREATE INDEX IF NOT EXISTS submissions_timestamp_idx ON submissions (timestamp)",
+]
+KEYS = {"comments": "comment_id", "submissions": "submission_id"}
+# The thread id used for the main thread, whose submissions don't have one
+MAIN_THREAD_ID = "main"
+
+
+def connect(filename, is_main=True):
+    """
+    Open the database at `filename` and make sure the tables used by the
+    loggers exist, along with indexes on the columns we search by.
+
+    The database is put in WAL mode, so readers aren't blocked while a
+    logging run is writing to it. Tables created by earlier versions don't
+    have primary keys, so they get unique indexes on the id columns instead,
+    unless they already contain duplicates. Those can be removed with
+    `rcounting db dedupe`.
+    """
+    db = sqlite3.connect(filename)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    extra_column = "base_count INTEGER" if is_main else "thread_id TEXT"
+    with db:
+        for statement in SCHEMA:
+            db.execute(statement.format(extra_column=extra_column))
+        for table, key in KEYS.items():
+            add_unique_key(db, table, key)
+        if "thread_id" in table_columns(db, "submissions"):
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS submissions_thread_idx ON submissions (thread_id)"
+            )
+        setup_checkpoints(db)
+    return db
+
+
+def setup_checkpoints(db):
+    """
+    Create the checkpoints table, which has one row per thread with the
+    newest logged submission, its timestamp, and its last logged comment.
+
+    Earlier versions rewrote the whole table on every update, and the main
+    thread's table didn't have a thread id at all. Tables like that are
+    converted to the keyed layout.
+    """
+    columns = table_columns(db, "checkpoints")
+    if columns and primary_key(db, "checkpoints") == ["thread_id"]:
+        return
+    if columns:
+        db.execute("ALTER TABLE checkpoints RENAME TO old_checkpoints")
+    db.execute(
+        "CREATE TABLE checkpoints (thread_id TEXT PRIMARY KEY, submission_id TEXT, "
+        "timestamp REAL, comment_id TEXT)"
+    )
+    if columns:
+        thread_id = "thread_id" if "thread_id" in columns else "?"
+        db.execute(
+            "INSERT OR REPLACE INTO checkpoints (thread_id, submission_id, timestamp) "
+            f"SELECT {thread_id}, submission_id, (SELECT timestamp FROM submissions "
+            "WHERE submissions.submission_id = old_checkpoints.submission_id) "
+            "FROM old_checkpoints ORDER BY rowid",
+            () if "thread_id" in columns else (MAIN_THREAD_ID,),
+        )
+        db.execute("DROP TABLE old_checkpoints")
+
+
+def add_unique_key(db, table, column):
+    """Make sure that `column` uniquely identifies the rows of `table`, if possible"""
+    if has_unique_key(db, table, column):
+        return True
+    try:
+        db.execute(f"CREATE UNIQUE INDEX {table}_{column}_key ON {table} ({column})")
+    except sqlite3.IntegrityError:
+        printer.warning(
+            "The %s table contains duplicate rows. Run `rcounting db dedupe` to remove them", table
+        )
+        db.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column}_idx ON {table} ({column})")
+        return False
+    db.execute(f"DROP INDEX IF EXISTS {table}_{column}_idx")
+    return True
+
+
+def has_unique_key(db, table, column):
+    if primary_key(db, table) == [column]:
+        return True
+    for index in db.execute(f"PRAGMA index_list({table})").fetchall():
+        if not index[2]:
+            continue
+        if [x[2] for x in db.execute(f"PRAGMA index_info({index[1]})")] == [column]:
+            return True
+    return False
+
+
+def deduplicate(db):
+    """
+    Remove duplicate rows from the logging tables, keeping the first copy of
+    each, and add the unique keys that prevent new duplicates.
+
+    Returns a dictionary with the number of rows removed from each table.
+    """
+    removed = {}
+    with db:
+        for table, key in KEYS.items():
+            if table not in {x[0] for x in db.execute("SELECT name FROM sqlite_master")}:
+                continue
+            removed[table] = db.execute(
+                f"DELETE FROM {table} WHERE rowid NOT IN "
+                f"(SELECT min(rowid) FROM {table} GROUP BY {key})"
+            ).rowcount
+            add_unique_key(db, table, key)
+        # Vacuuming can renumber the rows, so the counters table can't rely on
+        # knowing which rows it has already seen.
+        set_metadata(db, "counters_rowid", "0")
+    return removed
+
+
+def upsert_statement(table, columns, key):
+    """
+    An insert statement for `table` that updates the existing row instead
+    when a row with the same `key` is already present.
+    """
+    updates = ", ".join(f"{x} = excluded.{x}" for x in columns if x != key)
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT ({key}) DO UPDATE SET {updates}"
+    )
+
+
+def table_columns(db, table):
+    return [x[1] for x in db.execute(f"PRAGMA table_info({table})")]
+
+
+def primary_key(db, table):
+    return [x[1] for x in db.execute(f"PRAGMA table_info({table})") if x[5]]
+
+
+class WorkJournal:
+    """
+    A record of the progress of a logging run through a thread, stored in the
+    database so that it survives the run being interrupted.
+
+    For each submission that has been visited, the journal stores its title,
+    the get that was found in it, and the submission and comment it links
+    back to. Whether its comments have been written is already known from the
+    submissions table.
+
+    A run that's resumed uses the journal instead of asking reddit again, and
+    the journal for a thread is cleared once a run through it has finished.
+    """
+
+    fields = ["title", "get_id", "previous_submission_id", "previous_get_id"]
+
+    def __init__(self, db, thread_id):
+        self.db = db
+        self.thread_id = thread_id
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS journal (thread_id TEXT, submission_id TEXT, "
+                "title TEXT, get_id TEXT, previous_submission_id TEXT, previous_get_id TEXT, "
+                "PRIMARY KEY (thread_id, submission_id))"
+            )
+
+    def get(self, submission_id):
+        """Return the journal entry for `submission_id` as a dict, or None"""
+        row = self.db.execute(
+            f"SELECT {', '.join(self.fields)} FROM journal "
+            "WHERE thread_id = ? AND submission_id = ?",
+            (self.thread_id, submission_id),
+        ).fetchone()
+        return dict(zip(self.fields, row)) if row is not None else None
+
+    def record(self, submission_id, **values):
+        """Update the entry for `submission_id`, keeping any fields not in `values`"""
+        columns = ["thread_id", "submission_id"] + list(values)
+        updates = ", ".join(f"{x} = coalesce(excluded.{x}, {x})" for x in values)
+        with self.db:
+            self.db.execute(
+                f"INSERT INTO journal ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT (thread_id, submission_id) DO UPDATE SET {updates}",
+                (self.thread_id, submission_id, *values.values()),
+            )
+
+    def clear(self):
+        with self.db:
+            self.db.execute("DELETE FROM journal WHERE thread_id = ?", (self.thread_id,))
+
 
 class ThreadLogger:
-    """Simple class for logging either to a database or to a csv file"""
+    """
+    Simple class for logging submissions to a database.
+
+    Logged rows are buffered, and written with `executemany` in a single
+    transaction whenever more than `batch_size` comments are waiting, or when
+    `flush` is called.
+    """
 
     def __init__(
         self,
         filename: Path | str | None = None,
         is_main: bool = True,
         side_thread_id: str | None = None,
+        batch_size: int = 10000,
     ):
         self.is_main = is_main
         self.side_thread_id = side_thread_id
         self.last_checkpoint = ""
+        self.batch_size = batch_size
+        self.pending_comments = []
+        self.pending_submissions = []
         self.setup_sql(filename)
 
     def setup_sql(self, filename):
         """Connect to the database and get list of existing submissions, if any"""
         last_checkpoint = ""
-        known_submissions = []
         if filename is None:
             filename = "counting.sqlite"
         path = Path(filename)
         printer.debug("Writing submissions to sql database at %s", path)
-        db = sqlite3.connect(path)
-        try:
-            if self.side_thread_id is not None:
-                known_submissions = pd.read_sql(
-                    f"select submission_id from submissions "
-                    f"where submissions.thread_id == '{self.side_thread_id}'",
-                    db,
-                )
-            else:
-                known_submissions = pd.read_sql("select submission_id from submissions", db)
-            known_submissions = list(known_submissions["submission_id"])
-        except pd.io.sql.DatabaseError:
-            # The database error is for when the table doesn't exist in the
-            # database. That's not a big deal, so we just write a log message
-            # and continue merrily on our way.
-            printer.warning("Finding known submissions failed")
-            pass
-        try:
-            if self.side_thread_id is not None:
-                checkpoint = pd.read_sql(
-                    f"select submission_id from checkpoints "
-                    f"where thread_id == '{self.side_thread_id}'",
-                    db,
-                )
-            else:
-                checkpoint = pd.read_sql("select submission_id from checkpoints", db).iloc[-1]
-            if checkpoint.empty:
-                last_checkpoint = ""
-            else:
-                last_checkpoint = checkpoint.squeeze()
-        except pd.io.sql.DatabaseError:
-            printer.warning("Finding previous checkpoints failed")
-            pass
+        db = connect(path, self.is_main)
+        if self.side_thread_id is not None:
+            rows = db.execute(
+                "select submission_id from submissions where thread_id = ?",
+                (self.side_thread_id,),
+            )
+        else:
+            rows = db.execute("select submission_id from submissions")
+        known_submissions = {x[0] for x in rows}
+        checkpoint = db.execute(
+            "select submission_id from checkpoints where thread_id = ?", (self.thread_id,)
+        ).fetchone()
+        if checkpoint is not None:
+            last_checkpoint = checkpoint[0]
         self.db = db
-        self.last_checkpoint = last_checkpoint
+        self.last_checkpoint = last_checkpoint or ""
         self.known_submissions = known_submissions
+        self.journal = WorkJournal(db, self.thread_id)
+
+    @property
+    def thread_id(self):
+        """The key of this thread in the checkpoints table"""
+        return self.side_thread_id if self.side_thread_id is not None else MAIN_THREAD_ID
 
     def is_already_logged(self, submission):
         """
@@ -76,56 +272,291 @@ class ThreadLogger:
 
     def log(self, comment, df):
         """Save one submission to a database"""
-        submission = pd.Series(models.submission_to_dict(comment.submission))
-        submission = submission[["submission_id", "username", "timestamp", "title", "body"]]
+        submission = models.submission_to_dict(comment.submission)
+        submission = {x: submission[x] for x in SUBMISSION_COLUMNS}
         if self.is_main:
             submission["base_count"] = base_count(df)
         if self.side_thread_id is not None:
             submission["thread_id"] = self.side_thread_id
-        df.to_sql("comments", self.db, index_label="position", if_exists="append")
-        submission.to_frame().T.to_sql("submissions", self.db, index=False, if_exists="append")
+        self.pending_comments += [
+            (position, *[row[x] for x in COMMENT_COLUMNS[1:]])
+            for position, row in zip(df.index.tolist(), df.to_dict("records"))
+        ]
+        self.pending_submissions.append(submission)
+        self.known_submissions.add(submission["submission_id"])
+        self.journal.record(
+            submission["submission_id"], title=submission["title"], get_id=comment.id
+        )
+        if len(self.pending_comments) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered rows to the database in one transaction"""
+        if not self.pending_submissions:
+            return
+        submission_columns = list(self.pending_submissions[0])
+        with self.db:
+            self.db.executemany(
+                self.insert_statement("comments", COMMENT_COLUMNS), self.pending_comments
+            )
+            self.db.executemany(
+                self.insert_statement("submissions", submission_columns),
+                [tuple(x.values()) for x in self.pending_submissions],
+            )
+        self.pending_comments = []
+        self.pending_submissions = []
+
+    def insert_statement(self, table, columns):
+        """
+        Rows are upserted, so logging a submission again after an interrupted
+        run doesn't duplicate it. That needs a unique key, which databases with
+        unrepaired duplicates don't have; rows are appended to those instead.
+        """
+        key = KEYS[table]
+        if has_unique_key(self.db, table, key):
+            return upsert_statement(table, columns, key)
+        placeholders = ", ".join("?" * len(columns))
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
 
     def update_checkpoint(self):
+        """
+        Record the newest logged submission of the thread, and the last
+        comment logged in it, as the thread's checkpoint.
+        """
+        self.flush()
         if self.side_thread_id is not None:
-            newest_submission = pd.read_sql(
-                "select submission_id from submissions "
-                f"where submissions.thread_id == '{self.side_thread_id}' "
+            newest_submission = self.db.execute(
+                "select submission_id, timestamp from submissions where thread_id = ? "
                 "order by timestamp desc limit 1",
-                self.db,
-            ).squeeze()
-            checkpoints = pd.DataFrame(
-                columns=["submission_id"], index=pd.Series([], name="thread_id")
-            )
-            try:
-                checkpoints = pd.read_sql(
-                    "select * from checkpoints", self.db, index_col="thread_id"
-                )
-            except pd.io.sql.DatabaseError:
-                pass
-            checkpoints.loc[self.side_thread_id] = newest_submission
-            checkpoints.to_sql("checkpoints", self.db, if_exists="replace")
+                (self.side_thread_id,),
+            ).fetchone()
         else:
-            newest_submission = pd.read_sql(
-                "select submission_id from submissions order by timestamp desc limit 1", self.db
+            newest_submission = self.db.execute(
+                "select submission_id, timestamp from submissions order by timestamp desc limit 1"
+            ).fetchone()
+        if newest_submission is None:
+            return
+        submission_id, timestamp = newest_submission
+        comment_id = self.db.execute(
+            "select comment_id from comments where submission_id = ? "
+            "order by position desc limit 1",
+            (submission_id,),
+        ).fetchone()
+        comment_id = comment_id[0] if comment_id is not None else None
+        with self.db:
+            self.db.execute(
+                "insert into checkpoints (thread_id, submission_id, timestamp, comment_id) "
+                "values (?, ?, ?, ?) on conflict (thread_id) do update set "
+                "submission_id = excluded.submission_id, timestamp = excluded.timestamp, "
+                "comment_id = excluded.comment_id",
+                (self.thread_id, submission_id, timestamp, comment_id),
             )
-            newest_submission.name = "submission_id"
-            newest_submission.to_sql("checkpoints", self.db, index=False, if_exists="replace")
+        self.last_checkpoint = submission_id
+
+
+def get_metadata(db, key):
+    db.execute("CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)")
+    row = db.execute("SELECT value FROM metadata WHERE key = ?", (key,)).fetchone()
+    return row[0] if row is not None else None
+
+
+def set_metadata(db, key, value):
+    db.execute("CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)")
+    db.execute(
+        "INSERT INTO metadata (key, value) VALUES (?, ?) "
+        "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+        (key, value),
+    )
 
 
 def update_counters_table(db):
-    counting_users = pd.read_sql("select distinct username from comments", db)
-    counting_users["canonical_username"] = counting_users["username"].apply(counters.apply_alias)
-    counting_users["is_mod"] = counting_users["username"].apply(counters.is_mod)
-    counting_users["is_banned"] = counting_users["username"].apply(counters.is_banned_counter)
-    counting_users.to_sql("counters", db, index=False, if_exists="replace")
+    """
+    Add every username in the comments table that isn't already in the
+    counters table, along with its canonical name and mod and ban status.
+
+    Only comments logged since the previous update are searched for new
+    usernames. If the aliases or the lists of mods and banned counters have
+    changed since then, the whole table is rebuilt instead.
+    """
+    rules_hash = counters.rules_hash()
+    last_rowid = int(get_metadata(db, "counters_rowid") or 0)
+    if get_metadata(db, "counters_rules") != rules_hash or not has_unique_key(
+        db, "counters", "username"
+    ):
+        printer.debug("Rebuilding the counters table")
+        db.execute("DROP TABLE IF EXISTS counters")
+        db.execute(
+            "CREATE TABLE counters (username TEXT PRIMARY KEY, canonical_username TEXT, "
+            "is_mod INTEGER, is_banned INTEGER)"
+        )
+        last_rowid = 0
+    newest_rowid = db.execute("SELECT max(rowid) FROM comments").fetchone()[0] or 0
+    counting_users = pd.read_sql(
+        "SELECT DISTINCT username FROM comments WHERE rowid > ? AND NOT EXISTS "
+        "(SELECT 1 FROM counters WHERE counters.username = comments.username)",
+        db,
+        params=(last_rowid,),
+    )
+    usernames = counting_users["username"]
+    counting_users["canonical_username"] = counters.apply_aliases(usernames)
+    counting_users["is_mod"] = usernames.isin(counters.mods)
+    counting_users["is_banned"] = usernames.isin(counters.banned_counters)
+    with db:
+        counting_users.to_sql("counters", db, index=False, if_exists="append")
+        set_metadata(db, "counters_rowid", str(newest_rowid))
+        set_metadata(db, "counters_rules", rules_hash)
 
 
 def base_count(df):
-    return int(round((df["body"].apply(parsing.wrapped_count_in_text) - df.index).median(), -3))
+    return int(round((parsing.extract_counts(df["body"]) - df.index).median(), -3))
+
+
+def parquet_partitioning():
+    """The hive partitioning used for exported tables: one directory per thread and year"""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(
+        pa.schema([("thread_id", pa.string()), ("year", pa.int32())]), flavor="hive"
+    )
+
+
+def _parquet_tables(chunks):
+    """
+    Convert an iterator of data frames to arrow tables with a consistent
+    schema. Usernames are dictionary encoded, which is what makes
+    the exported data compact, and loads as a pandas categorical.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    known_types = {
+        "position": pa.int64(),
+        "timestamp": pa.float64(),
+        "base_count": pa.int64(),
+        "year": pa.int32(),
+        "username": pa.dictionary(pa.int32(), pa.string()),
+    }
+
+    def field_type(field):
+        if field.name in known_types:
+            return known_types[field.name]
+        return pa.string() if pa.types.is_null(field.type) else field.type
+
+    schema = None
+    for chunk in chunks:
+        chunk["year"] = pd.to_datetime(chunk["timestamp"], unit="s").dt.year
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        index = table.schema.get_field_index("username")
+        table = table.set_column(index, "username", pc.dictionary_encode(table["username"]))
+        if schema is None:
+            schema = pa.schema([pa.field(x.name, field_type(x)) for x in table.schema])
+        yield table.cast(schema)
+
+
+def export_parquet(db, directory, chunksize=500000):
+    """
+    Write the comments, submissions and counters tables of `db` to parquet
+    files in `directory`.
+
+    Comments and submissions are partitioned by thread and year, so that
+    `analysis.load_parquet` only has to read the parts that are needed. The
+    main thread has no thread id, and its rows are exported with the id
+    "main". The tables are read in chunks of `chunksize` rows, so the whole
+    database never needs to be in memory at once. Each chunk is read and
+    written on the calling thread, since pyarrow writes datasets from worker
+    threads and sqlite connections can't be shared between threads.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    if "thread_id" in table_columns(db, "submissions"):
+        thread_id = f"coalesce(submissions.thread_id, '{MAIN_THREAD_ID}')"
+    else:
+        thread_id = f"'{MAIN_THREAD_ID}'"
+    joins = {
+        "comments": "LEFT JOIN submissions ON comments.submission_id = submissions.submission_id",
+        "submissions": "",
+    }
+    for table, join in joins.items():
+        printer.info("Exporting %s", table)
+        columns = ", ".join(f'{table}."{x}"' for x in table_columns(db, table) if x != "thread_id")
+        query = (
+            f"SELECT {columns}, {thread_id} AS thread_id FROM {table} {join} "
+            f"ORDER BY {table}.timestamp"
+        )
+        shutil.rmtree(directory / table, ignore_errors=True)
+        chunks = _parquet_tables(pd.read_sql(query, db, chunksize=chunksize))
+        for chunk_index, chunk in enumerate(chunks):
+            ds.write_dataset(
+                chunk,
+                directory / table,
+                format="parquet",
+                partitioning=parquet_partitioning(),
+                basename_template=f"{table}-{chunk_index}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+    if "counters" in {x[0] for x in db.execute("SELECT name FROM sqlite_master")}:
+        printer.info("Exporting counters")
+        counting_users = pd.read_sql("SELECT * FROM counters", db)
+        counting_users["username"] = counting_users["username"].astype("category")
+        pq.write_table(
+            pa.Table.from_pandas(counting_users, preserve_index=False),
+            directory / "counters.parquet",
+        )
 
 
 def relabel_thread(db, old_id, new_id):
-    for table in ["threads", "submissions", "checkpoints"]:
-        df = pd.read_sql(f"select * from {table}", db)
-        df.loc[df["thread_id"] == old_id, "thread_id"] = new_id
-        df.drop_duplicates().to_sql(table, db, index=False, if_exists="replace")
+    """Change the thread id of every row that has `old_id` to `new_id`"""
+    relabel_threads(db, {old_id: new_id})
+
+
+def final_relabels(relabels):
+    """Map every old id in `relabels` to the end of its chain of relabellings"""
+    result = {}
+    for old_id in relabels:
+        seen = {old_id}
+        new_id = relabels[old_id]
+        while new_id in relabels and relabels[new_id] != new_id:
+            if new_id in seen:
+                raise ValueError(f"The relabelling of thread {old_id} is circular")
+            seen.add(new_id)
+            new_id = relabels[new_id]
+        result[old_id] = new_id
+    return {old_id: new_id for old_id, new_id in result.items() if old_id != new_id}
+
+
+def relabel_threads(db, relabels):
+    """
+    Apply every relabelling in the old_id -> new_id dictionary `relabels` in
+    a single transaction.
+
+    Chained relabellings like {a: b, b: c} are followed to the end, so both a
+    and b end up as c whatever order the dictionary is in. A cycle raises a
+    ValueError.
+
+    The tables are updated in place, so their schemas and indexes are
+    preserved. Rows that become exact duplicates of another row with the new
+    id are removed.
+    """
+    relabels = final_relabels(relabels)
+    tables = {x[0] for x in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    with db:
+        for table in ["threads", "submissions", "checkpoints"]:
+            if table not in tables:
+                continue
+            columns = ", ".join(f'"{x}"' for x in table_columns(db, table))
+            for old_id, new_id in relabels.items():
+                # Tables keyed by thread id keep the relabelled row if both exist
+                db.execute(
+                    f"UPDATE OR REPLACE {table} SET thread_id = ? WHERE thread_id = ?",
+                    (new_id, old_id),
+                )
+                db.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND rowid NOT IN "
+                    f"(SELECT min(rowid) FROM {table} WHERE thread_id = ? GROUP BY {columns})",
+                    (new_id, new_id),
+                )
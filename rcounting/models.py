@@ -1,12 +1,14 @@
+import asyncio
+import functools
 import logging
+from array import array
 from collections import defaultdict, deque
-from time import sleep
 
 from praw.exceptions import ClientException
 from praw.models import MoreComments
-from prawcore.exceptions import ServerError, TooManyRequests
+from prawcore.exceptions import ServerError
 
-from rcounting import parsing, utils
+from rcounting import async_reddit, comment_cache, parsing, rate_limit, utils
 
 printer = logging.getLogger(__name__)
 
@@ -16,6 +18,19 @@ class Comment:
     A lightweight class for combining a reddit comment object with a tree object
     """
 
+    __slots__ = (
+        "comment",
+        "tree",
+        "created_utc",
+        "removed",
+        "body",
+        "id",
+        "link_id",
+        "parent_id",
+        "author",
+        "is_root",
+    )
+
     def __init__(self, comment, tree):
         self.comment = comment
         self.tree = tree
@@ -24,6 +39,7 @@ class Comment:
         self.body = comment.body
         self.id = comment.id
         self.link_id = comment.link_id
+        self.parent_id = comment.parent_id
         self.author = str(comment.author)
         self.is_root = comment.is_root
 
@@ -35,6 +51,177 @@ class Comment:
         return self.tree.find_depth(self)
 
 
+class CompactComment(Comment):
+    """
+    A view of a single slot in a `CommentStore`.
+
+    It has the same interface as `Comment`, but nothing is copied on creation;
+    every attribute is read from the columns of the store on access.
+    """
+
+    __slots__ = ("slot",)
+
+    def __init__(self, slot, tree):
+        self.slot = slot
+        self.tree = tree
+
+    @property
+    def store(self):
+        return self.tree.nodes
+
+    @property
+    def comment(self):
+        """
+        The reddit comment object. The store doesn't keep it, so a lazy one is
+        made from the id, or None if the tree has no reddit instance.
+        """
+        if self.tree.reddit is None:
+            return None
+        return self.tree.reddit.comment(self.id)
+
+    @property
+    def id(self):
+        return self.store.ids[self.slot]
+
+    @property
+    def created_utc(self):
+        return self.store.created_utc[self.slot]
+
+    @property
+    def removed(self):
+        return bool(self.store.removed[self.slot])
+
+    @property
+    def body(self):
+        return self.store.bodies[self.slot]
+
+    @property
+    def author(self):
+        return self.store.authors[self.store.author[self.slot]]
+
+    @property
+    def link_id(self):
+        return "t3_" + self.store.submissions[self.store.submission[self.slot]]
+
+    @property
+    def is_root(self):
+        return bool(self.store.is_root[self.slot])
+
+    @property
+    def parent_id(self):
+        if self.is_root:
+            return self.link_id
+        return "t1_" + self.store.ids[self.store.parent[self.slot]]
+
+
+class CommentStore:
+    """
+    Columnar storage for the comments in a comment tree.
+
+    Each comment id is interned to an integer slot, and the fields we care
+    about are stored in one array per field, indexed by slot. Authors and
+    submissions are interned as well, so each comment only stores an index
+    into the list of known names. Parents are stored by slot, which means that
+    an id can be given a slot before the comment itself has been seen; such
+    slots are not considered part of the store until they are filled.
+
+    The class supports the subset of the dict interface that `Tree` uses for
+    its nodes, with slots playing the role of values.
+    """
+
+    def __init__(self, comments=None):
+        self.slots = {}
+        self.ids = []
+        self.present = array("b")
+        self.created_utc = array("d")
+        self.removed = array("b")
+        self.is_root = array("b")
+        self.parent = array("l")
+        self.author = array("l")
+        self.authors = []
+        self._author_slots = {}
+        self.submission = array("l")
+        self.submissions = []
+        self._submission_slots = {}
+        self.bodies = []
+        self._size = 0
+        if comments is not None:
+            self.update({x.id: x for x in comments})
+
+    def intern(self, comment_id):
+        """Return the slot of `comment_id`, reserving a new one if necessary"""
+        if comment_id in self.slots:
+            return self.slots[comment_id]
+        slot = len(self.ids)
+        self.slots[comment_id] = slot
+        self.ids.append(comment_id)
+        self.present.append(0)
+        self.created_utc.append(0)
+        self.removed.append(0)
+        self.is_root.append(0)
+        self.parent.append(-1)
+        self.author.append(-1)
+        self.submission.append(-1)
+        self.bodies.append(None)
+        return slot
+
+    @staticmethod
+    def _intern_name(name, names, slots):
+        if name not in slots:
+            slots[name] = len(names)
+            names.append(name)
+        return slots[name]
+
+    def add(self, comment):
+        slot = self.intern(comment.id)
+        if not self.present[slot]:
+            self._size += 1
+        self.present[slot] = 1
+        self.created_utc[slot] = comment.created_utc
+        self.removed[slot] = bool(getattr(comment, "removed", False))
+        self.is_root[slot] = bool(comment.is_root)
+        self.parent[slot] = -1 if comment.is_root else self.intern(comment.parent_id[3:])
+        self.author[slot] = self._intern_name(
+            str(comment.author), self.authors, self._author_slots
+        )
+        self.submission[slot] = self._intern_name(
+            comment.link_id[3:], self.submissions, self._submission_slots
+        )
+        self.bodies[slot] = comment.body
+        return slot
+
+    def update(self, comments):
+        for comment in comments.values():
+            self.add(comment)
+
+    def __contains__(self, comment_id):
+        slot = self.slots.get(comment_id)
+        return slot is not None and bool(self.present[slot])
+
+    def __getitem__(self, comment_id):
+        if comment_id not in self:
+            raise KeyError(comment_id)
+        return self.slots[comment_id]
+
+    def __delitem__(self, comment_id):
+        slot = self[comment_id]
+        self.present[slot] = 0
+        self.bodies[slot] = None
+        self._size -= 1
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return (x for x, slot in self.slots.items() if self.present[slot])
+
+    def keys(self):
+        return set(self)
+
+    def values(self):
+        return (slot for slot in self.slots.values() if self.present[slot])
+
+
 class Tree:
     """
     A class for dealing with tree structures.
@@ -48,25 +235,87 @@ class Tree:
     def __init__(self, nodes, tree):
         self.tree = tree
         self.nodes = nodes
+        # The parent -> children index is kept in sync with `self.tree` by
+        # every method that adds or removes edges, so that looking up the
+        # children of a node doesn't require a pass over the whole tree.
+        self.reversed_tree = dict(
+            edges_to_tree([(parent, child) for child, parent in self.tree.items()])
+        )
+        # Depths are maintained in the same way, along with a depth -> nodes
+        # index which makes finding the deepest node a constant time operation
         self.depths = {}
+        self._nodes_by_depth = defaultdict(dict)
+        self._max_depth = 0
+        self._refresh_depths(self.nodes.keys() | self.tree.keys())
 
     def __contains__(self, node):
         node_id = extract_id(node)
-        return node_id in self.tree.keys() or node_id in self.tree.values()
+        return node_id in self.tree or node_id in self.reversed_tree
 
     def __len__(self):
         return len(self.tree.keys())
 
-    @property
-    def reversed_tree(self):
-        return edges_to_tree([(parent, child) for child, parent in self.tree.items()])
+    def _add_edge(self, child_id, parent_id):
+        old_parent_id = self.tree.get(child_id)
+        if old_parent_id == parent_id:
+            return
+        if old_parent_id is not None:
+            self._remove_edge(child_id)
+        self.tree[child_id] = parent_id
+        self.reversed_tree.setdefault(parent_id, []).append(child_id)
+
+    def _remove_edge(self, child_id):
+        parent_id = self.tree.pop(child_id)
+        siblings = self.reversed_tree[parent_id]
+        siblings.remove(child_id)
+        if not siblings:
+            del self.reversed_tree[parent_id]
+
+    def _set_depth(self, node_id, depth):
+        old_depth = self.depths.get(node_id)
+        if old_depth is not None and old_depth != depth:
+            self._forget_depth(node_id)
+        self.depths[node_id] = depth
+        if node_id in self.nodes:
+            self._nodes_by_depth[depth][node_id] = None
+            self._max_depth = max(self._max_depth, depth)
+        return old_depth != depth
+
+    def _forget_depth(self, node_id):
+        depth = self.depths.pop(node_id, None)
+        bucket = self._nodes_by_depth.get(depth)
+        if bucket is None:
+            return
+        bucket.pop(node_id, None)
+        if not bucket:
+            del self._nodes_by_depth[depth]
+        while self._max_depth and self._max_depth not in self._nodes_by_depth:
+            self._max_depth -= 1
+
+    def _refresh_depths(self, node_ids):
+        """
+        Recalculate the depths of `node_ids`, and of every descendant whose
+        depth changes as a result.
+
+        Only the part of the tree below the affected nodes is visited, and each
+        descendant is only visited if the depth of its parent actually changed.
+        """
+        node_ids = set(node_ids)
+        queue = deque(x for x in node_ids if self.tree.get(x) not in node_ids)
+        while queue:
+            node_id = queue.popleft()
+            parent_depth = self.depths.get(self.tree.get(node_id), 0)
+            changed = self._set_depth(node_id, parent_depth + 1)
+            for child_id in self.reversed_tree.get(node_id, []):
+                if changed or child_id in node_ids:
+                    queue.append(child_id)
 
     def parent(self, node):
         parent_id = self.tree[extract_id(node)]
         return self.node(parent_id)
 
     def find_children(self, node):
-        return [self.node(x) for x in self.reversed_tree[extract_id(node)]]
+        return [self.node(x) for x in self.reversed_tree.get(extract_id(node), [])]
 
     def walk_up_tree(self, node, limit=None, cutoff=None):
         """Navigate the tree from node to root"""
@@ -118,7 +367,8 @@ class Tree:
         child_id = extract_id(child)
         parent_id = extract_id(parent)
         if self.tree.get(child_id, float("nan")) == parent_id:
-            del self.tree[child_id]
+            self._remove_edge(child_id)
+            self._refresh_depths([child_id])
 
     def delete_node(self, node):
         """Given a node id, this will delete the node from the tree if it is
@@ -130,14 +380,21 @@ class Tree:
         if node_id in self.nodes:
             del self.nodes[node_id]
         if node_id in self.tree:
-            del self.tree[node_id]
+            self._remove_edge(node_id)
+        self._forget_depth(node_id)
+        self._refresh_depths(self.reversed_tree.get(node_id, []))
 
     def delete_subtree(self, node):
         """Delete the entire subtree rooted at the `node`"""
         queue = deque([node])
+        subtree = []
         while queue:
             node = queue.popleft()
             queue.extend(self.find_children(node))
+            subtree.append(node)
+        # Deleting from the leaves upwards means that no remaining node ever
+        # changes depth along the way
+        for node in reversed(subtree):
             self.delete_node(node)
 
     def find_depth(self, node):
@@ -146,34 +403,17 @@ class Tree:
 
         The root nodes have depth 1. Otherwise, each node is one deeper than its parent.
         """
-        node_id = extract_id(node)
-        if node_id not in self.depths:
-            self.calculate_depths()
-        return self.depths[node_id]
-
-    def calculate_depths(self):
-        to_be_expanded = [(root_id, 1) for root_id in self.root_ids]
-        while to_be_expanded:
-            node_id, depth = to_be_expanded.pop()
-            children = self.find_children(node_id)
-            to_be_expanded += [(child.id, depth + 1) for child in children]
-            self.depths[node_id] = depth
+        return self.depths[extract_id(node)]
 
     @property
     def deepest_node(self):
-        max_depth = 0
-        result = None
-        self.calculate_depths()
-        for leaf in self.leaves:
-            depth = self.depths[extract_id(leaf)]
-            if depth > max_depth:
-                max_depth = depth
-                result = leaf
-        return result
+        if not self._nodes_by_depth:
+            return None
+        return self.node(next(iter(self._nodes_by_depth[self._max_depth])))
 
     @property
     def leaves(self):
-        leaf_ids = set(self.nodes.keys()) - set(self.tree.values())
+        leaf_ids = self.nodes.keys() - self.reversed_tree.keys()
         return [self.node(leaf_id) for leaf_id in leaf_ids]
 
     @property
@@ -182,13 +422,15 @@ class Tree:
 
     @property
     def root_ids(self):
-        root_ids = (set(self.nodes.keys()) | set(self.tree.values())) - set(self.tree.keys())
+        root_ids = (self.nodes.keys() | self.reversed_tree.keys()) - self.tree.keys()
         root_ids = [[x] if x in self.nodes else self.reversed_tree[x] for x in root_ids]
         return [root_id for ids in root_ids for root_id in ids]
 
     def add_nodes(self, new_nodes, new_tree):
-        self.tree.update(new_tree)
         self.nodes.update(new_nodes)
+        for child_id, parent_id in new_tree.items():
+            self._add_edge(child_id, parent_id)
+        self._refresh_depths(new_nodes.keys() | new_tree.keys())
 
 
 class CommentTree(Tree):
@@ -200,13 +442,24 @@ class CommentTree(Tree):
     that many of the methods for finding parents & children have to be overridden.
     """
 
-    def __init__(self, comments=None, reddit=None, get_missing_replies=True):
+    def __init__(
+        self, comments=None, reddit=None, get_missing_replies=True, compact=False, cache=None
+    ):
         if comments is None:
             comments = []
         tree = {x.id: x.parent_id[3:] for x in comments if not x.is_root}
-        comments = {x.id: x for x in comments}
+        # The compact store drops the underlying praw objects, which keeps the
+        # memory footprint of large trees down
+        self.compact = compact
+        self._view = CompactComment if compact else Comment
+        comments = CommentStore(comments) if compact else {x.id: x for x in comments}
         super().__init__(comments, tree)
         self.reddit = reddit
+        # Comments are only looked up in the cache before going to reddit, so
+        # trees without a reddit instance don't need one
+        if cache is None and reddit is not None:
+            cache = comment_cache.default_cache()
+        self.cache = cache
         self.get_missing_replies = get_missing_replies
         # logger levels are 10, 20, 30, where 10 is most verbose
         self.refresh_counter = [0, 5, 2][3 - int(printer.getEffectiveLevel() // 10)]
@@ -214,9 +467,43 @@ class CommentTree(Tree):
         self.comment = self.node
 
     def node(self, node_id):
-        if node_id not in self.tree:
+        if node_id not in self.tree and not self._is_known_root(node_id):
             self.add_missing_parents(node_id)
-        return Comment(super().node(node_id), self)
+        return self._view(super().node(node_id), self)
+
+    def _is_known_root(self, node_id):
+        return node_id in self.nodes and self._view(self.nodes[node_id], self).is_root
+
+    def _find_submission_id(self, comment_id):
+        """
+        Find the submission a comment belongs to without going to reddit.
+
+        That's possible if either the comment itself or one of its children is
+        already in the tree.
+        """
+        candidates = [comment_id] + self.reversed_tree.get(comment_id, [])[:1]
+        for candidate in candidates:
+            if candidate in self.nodes:
+                return self._view(self.nodes[candidate], self).link_id[3:]
+        return None
+
+    def _fetch_context(self, comment_id):
+        """
+        Fetch a comment along with as many of its ancestors as reddit will return
+        in a single request.
+
+        If the submission the comment belongs to is unknown, it has to be looked
+        up first. For root comments that lookup is all we need, and the
+        comment is returned by itself.
+        """
+        submission_id = self._find_submission_id(comment_id)
+        if submission_id is None:
+            cached = self.cache.get(comment_id) if self.cache is not None else None
+            praw_comment = cached if cached is not None else self.reddit.comment(comment_id)
+            if praw_comment.is_root:
+                return [praw_comment]
+            submission_id = praw_comment.link_id[3:]
+        return rate_limit.retry(fetch_context, self.reddit, submission_id, comment_id)
 
     def add_comments(self, comments):
         new_comments = {x.id: x for x in comments}
@@ -225,46 +512,82 @@ class CommentTree(Tree):
 
     @property
     def comments(self):
-        return self.nodes.values()
+        """A list of views of every comment in the tree"""
+        return [self._view(x, self) for x in self.nodes.values()]
 
     def add_missing_parents(self, comment_id):
-        comments = []
+        """
+        Add a comment and up to eight of its ancestors to the tree.
+
+        If the submission is already known, this takes a single request to the
+        context endpoint; otherwise the comment has to be looked up first.
+        """
         if self.reddit is None:
             return
-        praw_comment = self.reddit.comment(comment_id)
-        if praw_comment.is_root:
-            self.add_comments([praw_comment])
-            return
+        if self.cache is not None:
+            comments = self.cache.get_ancestors(comment_id)
+            if comments:
+                self.add_comments(comments)
+                return
         try:
-            sleep_interval = 10
-            while True:
-                try:
-                    praw_comment.refresh()
-                    break
-                except TooManyRequests:
-                    printer.warning(f"Getting rate limited. Sleeping for {sleep_interval}s.")
-                    sleep(sleep_interval)
-                    sleep_interval *= 1.5
-
-            if self._parent_counter == 0:
-                printer.info("Fetching ancestors of comment %s", normalise(praw_comment.body))
-                self._parent_counter = self.refresh_counter
-            else:
-                self._parent_counter -= 1
+            comments = self._fetch_context(comment_id)
         except (ClientException, ServerError) as e:
             printer.warning("Unable to refresh %s", comment_id)
             print(e)
-        for _ in range(9):
-            comments.append(praw_comment)
-            if praw_comment.is_root:
-                break
-            praw_comment = praw_comment.parent()
+            comments = [self.reddit.comment(comment_id)]
+        if self._parent_counter == 0:
+            printer.info("Fetching ancestors of comment %s", normalise(comments[0].body))
+            self._parent_counter = self.refresh_counter
+        else:
+            self._parent_counter -= 1
         self.add_comments(comments)
+        if self.cache is not None:
+            self.cache.add(comments)
 
-    def fill_gaps(self):
-        for node in self.roots:
-            if not node.is_root:
-                node.walk_up_tree()
+    def fill_gaps(self, concurrency=async_reddit.DEFAULT_CONCURRENCY):
+        """Connect every comment in the tree to the top level of its submission"""
+        if self.reddit is None:
+            return
+        async_reddit.run(self.fill_gaps_async, self.reddit, concurrency=concurrency)
+
+    async def fill_gaps_async(self, client):
+        """
+        Walk every gap in the tree upwards until it reaches the top level.
+
+        Each round fetches the context of every remaining gap at the same time,
+        so the number of round trips depends on the length of the longest gap
+        rather than on the number of gaps.
+        """
+        failed = set()
+        while True:
+            tops = [self._view(self.nodes[x], self) for x in self.root_ids]
+            gaps = {
+                x.parent_id[3:]: x.link_id[3:]
+                for x in tops
+                if not x.is_root and x.parent_id[3:] not in failed
+            }
+            if not gaps:
+                return
+            if self.cache is not None:
+                for parent_id in list(gaps):
+                    comments = self.cache.get_ancestors(parent_id)
+                    if comments:
+                        self.add_comments(comments)
+                        del gaps[parent_id]
+            results = await asyncio.gather(
+                *[client.call(fetch_context, self.reddit, y, x) for x, y in gaps.items()],
+                return_exceptions=True,
+            )
+            for parent_id, result in zip(gaps, results):
+                if isinstance(result, (ClientException, ServerError)):
+                    printer.warning("Unable to refresh %s", parent_id)
+                    failed.add(parent_id)
+                    continue
+                if isinstance(result, BaseException):
+                    raise result
+                self.add_comments(result)
+                if self.cache is not None:
+                    self.cache.add(result)
 
     def find_children(self, node):
         """
@@ -277,7 +600,7 @@ class CommentTree(Tree):
 
         """
         node_id = extract_id(node)
-        children = [self.comment(x) for x in self.reversed_tree[node_id]]
+        children = [self.comment(x) for x in self.reversed_tree.get(node_id, [])]
         if not children and self.get_missing_replies:
             children = self.add_missing_replies(node_id)
 
@@ -290,16 +613,71 @@ class CommentTree(Tree):
         comment_id = extract_id(comment)
         if self.reddit is None:
             return []
-        praw_comment = self.reddit.comment(comment_id)
-        if comment_id not in self.nodes:
-            self.add_comments([praw_comment])
-
-        praw_comment.refresh()
-        replies = find_all_replies(praw_comment, limit)
-        if replies:
+        replies = self._cached_replies(comment_id)
+        if replies is not None:
+            replies = replies[:limit]
             self.add_comments(replies)
             return [self.comment(x.id) for x in replies]
-        return []
+        if self._find_submission_id(comment_id) is None:
+            context = fetch_comment_with_context(self.reddit, None, comment_id)
+        else:
+            context = self._fetch_context(comment_id)
+        replies = find_all_replies(context[0], limit)
+        return self._add_fetched_replies(context, replies, complete=limit is None)
+
+    def expand(self, comments, concurrency=async_reddit.DEFAULT_CONCURRENCY):
+        """
+        Add all the replies to each of `comments` to the tree.
+
+        This is equivalent to calling `add_missing_replies` on each comment in
+        turn, except that the replies to different comments are fetched concurrently.
+        """
+        if self.reddit is None:
+            return
+        async_reddit.run(self.expand_async, self.reddit, comments, concurrency=concurrency)
+
+    async def expand_async(self, client, comments):
+        missing = []
+        for comment_id in [extract_id(x) for x in comments]:
+            replies = self._cached_replies(comment_id)
+            if replies is None:
+                missing.append(comment_id)
+            else:
+                self.add_comments(replies)
+        submission_ids = [self._find_submission_id(x) for x in missing]
+        contexts = await client.map(
+            functools.partial(fetch_comment_with_context, self.reddit), submission_ids, missing
+        )
+        replies = await asyncio.gather(*[client.find_all_replies(x[0]) for x in contexts])
+        for context, comment_replies in zip(contexts, replies):
+            self._add_fetched_replies(context, comment_replies, complete=True)
+
+    def _add_fetched_replies(self, context, replies, complete):
+        """
+        Add a comment fetched from reddit to the tree, along with its ancestors
+        in `context` and its `replies`, and return views of the replies.
+        """
+        praw_comment = context[0]
+        # The ancestors came along for free, so there's no reason not to keep them
+        self.add_comments([x for x in context if x.id not in self.nodes])
+        if self.cache is not None:
+            self.cache.add(context)
+            # If every reply has been expanded, the cache can vouch for the
+            # whole subtree below the comment
+            self.cache.add([praw_comment] + replies, complete_replies=complete)
+        self.add_comments(replies)
+        return [self.comment(x.id) for x in replies]
+
+    def _cached_replies(self, comment_id):
+        """Return the cached replies to a comment, or None if they aren't available"""
+        if self.cache is None:
+            return None
+        if comment_id not in self.nodes:
+            cached = self.cache.get(comment_id)
+            if cached is None:
+                return None
+            self.add_comments([cached])
+        return self.cache.get_replies(comment_id)
 
     def prune(self, side_thread, comment=None):
         """
@@ -310,15 +688,15 @@ class CommentTree(Tree):
             nodes = self.roots
         else:
             nodes = self.find_children(comment)
-        queue = deque([(node, side_thread.get_history(node)) for node in nodes])
+        queue = deque([(node, side_thread.validation_state(node)) for node in nodes])
         while queue:
-            node, history = queue.popleft()
+            node, state = queue.popleft()
             if node.removed:
                 self.delete_subtree(node)
                 continue
-            is_valid, new_history = side_thread.is_valid_count(node, history)
+            is_valid, new_state = side_thread.is_valid_count(node, state)
             if is_valid:
-                queue.extend([(x, new_history) for x in self.find_children(node)])
+                queue.extend([(x, new_state) for x in self.find_children(node)])
             else:
                 self.delete_subtree(node)
 
@@ -386,6 +764,49 @@ def extract_id(node):
     return node
 
 
+def fetch_context(reddit, submission_id, comment_id):
+    """
+    Fetch a comment and the chain of its ancestors in a single request.
+
+    The chain is ordered from the comment itself upwards. Reddit returns at
+    most eight ancestors, no matter how much context is requested.
+    """
+    path = f"comments/{submission_id}/_/{comment_id}"
+    comments = list(reddit.get(path, params={"context": 100})[1].children)
+    by_id = {}
+    while comments:
+        comment = comments.pop()
+        if isinstance(comment, MoreComments):
+            continue
+        by_id[comment.id] = comment
+        comments.extend(comment.replies)
+    if comment_id not in by_id:
+        raise ClientException(f"Comment {comment_id} not found in submission {submission_id}")
+    chain = [by_id[comment_id]]
+    while not chain[-1].is_root and chain[-1].parent_id[3:] in by_id:
+        chain.append(by_id[chain[-1].parent_id[3:]])
+    return chain
+
+
+def fetch_comment_with_context(reddit, submission_id, comment_id):
+    """
+    Fetch a comment along with its replies and as many ancestors as possible.
+
+    Without a submission id, the comment is fetched on its own, since the
+    context endpoint needs to know the submission.
+    """
+    if submission_id is None:
+        praw_comment = reddit.comment(comment_id)
+        praw_comment.refresh()
+        return [praw_comment]
+    return fetch_context(reddit, submission_id, comment_id)
+
+
+def fetch_comments_by_id(reddit, comment_ids):
+    """Fetch many comments at once. The info endpoint accepts 100 ids per request"""
+    return list(reddit.info(fullnames=[f"t1_{x}" for x in comment_ids]))
+
+
 def find_all_replies(comment, limit: int | None = None):
     """Return a list of all replies to a comment, with each `MoreComments`
     instance expanded. The comments might be out of order, and due to reddit
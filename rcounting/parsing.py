@@ -1,29 +1,72 @@
 """A collection of functions for parsing texts and extracting urls and counts"""
 
+import functools
 import re
 import warnings
 
-from rcounting.reddit_interface import extract_from_short_link
+from rcounting.reddit_interface import resolve_short_links
 
 
 def find_body(post):
     return post.body if hasattr(post, "body") else post.selftext
 
 
+MARKDOWN_LINK_REGEX = r"\[(.*?)\]\((.+?(?<!\\))\)"
+SEPARATORS = "' ,.*/"  # non-whitespace separators people have used
+
+
+class CountExtractor:
+    """
+    Extract normalized base n representations of integers from messy comments.
+
+    The character class, regex and translation table only depend on the base,
+    so they are built once, and `count_extractor` hands out a shared instance
+    for each base.
+    """
+
+    def __init__(self, base: int = 10, bijective=False):
+        self.base = base
+        characters = "0123456789abcdefghijklmnopqrstuvwxyz"[int(bijective) : base + int(bijective)]
+        self.regex = re.compile(f"[{characters}]+")
+        self.translation = str.maketrans("", "", SEPARATORS)
+
+    def extract(self, body: str) -> str:
+        """
+        Extract the count from a single comment. Try to account for various
+        strategies for separating thousands digits.
+        """
+        first_line = "".join(normalize_comment_body(body).split()).translate(self.translation)
+        match = self.regex.search(first_line.lower())
+        if match is not None:
+            return match.group()
+        raise ValueError(f"Unable to extract count in base {self.base} from comment body: {body}")
+
+    def extract_many(self, bodies):
+        """
+        Extract the count strings from a pandas Series of comment bodies in one
+        pass. Bodies without a count give NaN.
+        """
+        first_lines = (
+            bodies.str.split("\n", n=1)
+            .str[0]
+            .str.replace(MARKDOWN_LINK_REGEX, r"\1", regex=True)
+            .str.replace(f"[\\s{re.escape(SEPARATORS)}]+", "", regex=True)
+            .str.lower()
+        )
+        return first_lines.str.extract(f"({self.regex.pattern})", expand=False)
+
+
+@functools.lru_cache
+def count_extractor(base: int = 10, bijective=False) -> CountExtractor:
+    return CountExtractor(base, bijective)
+
+
 def extract_count_string(body: str, base: int = 10, bijective=False):
     """
     Extract a normalized base n representation of an integer from a messy comment.
     Try to account for various strategies for separating thousands digits.
     """
-    characters = "0123456789abcdefghijklmnopqrstuvwxyz"[int(bijective) : base + int(bijective)]
-    separators = "' ,.*/"  # non-whitespace separators people have used
-    first_line = "".join(normalize_comment_body(body).split()).translate(
-        str.maketrans("", "", separators)
-    )
-    match = re.search(f"[{characters}]+", first_line.lower())
-    if match is not None:
-        return match.group()
-    raise ValueError(f"Unable to extract count in base {base} from comment body: {body}")
+    return count_extractor(base, bijective).extract(body)
 
 
 def find_count_in_text(body: str, base: int = 10):
@@ -38,12 +81,39 @@ def wrapped_count_in_text(body: str, base: int = 10):
         return float("nan")
 
 
+def extract_counts(bodies, base: int = 10):
+    """
+    The vectorized version of `wrapped_count_in_text`: extract the count from
+    every comment body in a pandas Series, giving NaN where there isn't one.
+    """
+    strings = count_extractor(base).extract_many(bodies)
+    return strings.map(functools.partial(int, base=base), na_action="ignore").astype(float)
+
+
+SHORT_LINK_REGEX = "reddit.com/r/counting/s/([A-Za-z0-9]+)"
+SHORT_LINK_PREFIX = "https://www.reddit.com/r/counting/s/"
+
+
+def find_short_links(body):
+    """Return (url, position) for every reddit.com/r/counting/s/... short link in a string"""
+    matches = re.finditer(SHORT_LINK_REGEX, body)
+    return [(SHORT_LINK_PREFIX + m.groups()[0], m.start()) for m in matches]
+
+
+def resolve_short_links_in(bodies):
+    """Resolve the short links in all of `bodies` at once, so that parsing them is cached"""
+    resolve_short_links([url for body in bodies for url, _ in find_short_links(body)])
+
+
 def find_urls_in_text(body):
     """Extract all substrings of a string that look like '/comments/id/stuff/id'
 
     Returns a list of (submission_id, comment_id) tuples; the `comment_id`
     field is potentially blank, if someone accidentally linked to just a
     submission rather than a comment.
+
+    Short links are resolved through `reddit_interface.resolve_short_links`,
+    so any that have been seen before don't require a request to reddit.
     """
     # reddit lets you link to comments and posts with just /comments/stuff,
     # so everything before that is optional. We only capture the bit after
@@ -64,12 +134,9 @@ def find_urls_in_text(body):
 
     # reddit has introduced new short links which are completely opaque to the
     # api. We need to handle those separately.
-    new_url_regex = "reddit.com/r/counting/s/([A-Za-z0-9]+)"
-    new_url_prefix = "https://www.reddit.com/r/counting/s/"
-    short_links = [
-        (new_url_prefix + m.groups()[0], m.start()) for m in re.finditer(new_url_regex, body)
-    ]
-    extra_matches = [(extract_from_short_link(link[0]), link[1]) for link in short_links]
+    short_links = find_short_links(body)
+    resolved = resolve_short_links([url for url, _ in short_links]) if short_links else {}
+    extra_matches = [(resolved[url], position) for url, position in short_links]
     result = [x[0] for x in sorted(normal_matches + extra_matches, key=lambda x: x[1])]
     return result
 
@@ -96,9 +163,7 @@ def parse_markdown_links(body):
 
 def strip_markdown_links(body):
     """Replace all markdown links of the form [description](link) with description."""
-    regex = r"\[(.*?)\]\((.+?(?<!\\))\)"
-    replacement = r"\1"
-    return re.sub(regex, replacement, body)
+    return re.sub(MARKDOWN_LINK_REGEX, r"\1", body)
 
 
 def body_from_title(title):
@@ -113,6 +178,7 @@ def normalize_comment_body(comment):
 
 def parse_directory_page(directory_page):
     """Tag each paragraph of a directory page by whether it represents text or a table."""
+    resolve_short_links_in([directory_page])
     directory_page = re.sub(r"\n{2,}", r"\n\n", directory_page)
     regex = r"^.*\|.*\|.*$"
     tagged_results = []
@@ -165,7 +231,6 @@ def parse_row(markdown_row):
 
 def find_urls_in_submission(submission):
     """Extract urls from both the body of the submission and the top-level comments"""
-    # Get everything that looks like a url in every top level comment
     with warnings.catch_warnings():
         warnings.filterwarnings("error")
         try:
@@ -176,12 +241,15 @@ def find_urls_in_submission(submission):
             submission = reddit.submission(submission.id)
             submission.comment_sort = "new"
 
-    for comment in submission.comments:
-        yield from find_urls_in_text(comment.body)
-    # And then in the body of the post. The reason for doing it in this order
+    # Get everything that looks like a url in every top level comment, and
+    # then in the body of the post. The reason for doing it in this order
     # is that it is possible for outsiders to add a comment afterwards to point at the
-    # correct link, but it is not possible for them to edit the post body
-    yield from find_urls_in_text(submission.selftext)
+    # correct link, but it is not possible for them to edit the post body.
+    # All the short links are resolved in one go before parsing starts.
+    bodies = [comment.body for comment in submission.comments] + [submission.selftext]
+    resolve_short_links_in(bodies)
+    for body in bodies:
+        yield from find_urls_in_text(body)
 
 
 def is_revived(title):
@@ -9,7 +9,7 @@ from cycler import cycler
 from pandas.plotting import register_matplotlib_converters
 
 from rcounting.analysis import fft_kde
-from rcounting.counters import apply_alias, is_banned_counter
+from rcounting.counters import apply_aliases, is_banned_counter
 from rcounting.units import DAY, HOUR, MINUTE
 
 register_matplotlib_converters()
@@ -25,8 +25,8 @@ def format_x_date_month(ax):
 
 
 def parts_vs_counts(df):
-    k_parts = df.groupby("username")["submission_id"].nunique()
-    hoc = df.groupby("username")["submission_id"].count()
+    k_parts = df.groupby("username", observed=True)["submission_id"].nunique()
+    hoc = df.groupby("username", observed=True)["submission_id"].count()
     combined = pd.merge(k_parts, hoc, left_index=True, right_index=True)
     combined.columns = ["k_parts", "total_counts"]
     combined = combined.query("k_parts > 10")
@@ -57,14 +57,16 @@ def hoc_by_time(df, n=25, ax=None):
         df.set_index("date", inplace=True)
         df.sort_index(inplace=True)
 
-    df["username"] = df["username"].apply(apply_alias)
+    df["username"] = apply_aliases(df["username"])
     top_counters = [
         x
-        for x in df.groupby("username").size().sort_values(ascending=False).index
+        for x in df.groupby("username", observed=True).size().sort_values(ascending=False).index
         if not is_banned_counter(x)
     ][:n]
     filtered = df.query("username in @top_counters")
-    cumulative = pd.get_dummies(filtered["username"]).resample("12h").sum().expanding().sum()
+    cumulative = (
+        pd.get_dummies(filtered["username"].astype(object)).resample("12h").sum().expanding().sum()
+    )
     cumulative[top_counters].plot(ax=ax)
     plt.legend(bbox_to_anchor=(1.05, 1.07))
     ax.set_ylabel("Cumulative counts")
@@ -77,7 +79,9 @@ def speedrun_histogram(df, n=3):
     bins = np.arange(0, 21)
     df = df.copy()
     df["dt"] = df["timestamp"].diff()
-    counters = df.query("dt < 20").groupby("username")["dt"].mean().sort_values().index
+    counters = (
+        df.query("dt < 20").groupby("username", observed=True)["dt"].mean().sort_values().index
+    )
     fig, axes = plt.subplots(n, sharex=True, sharey=True)
     colors = plt.rcParams["axes.prop_cycle"].by_key()["color"]
     for idx, counter in enumerate(counters[:n]):
@@ -0,0 +1,162 @@
+"""
+A single rate limiter shared by every request made to reddit.
+
+Reddit tells clients how many requests they have left in the current window
+and how long until the window resets, through the `x-ratelimit-remaining` and
+`x-ratelimit-reset` headers. The limiter turns that into a token bucket: the
+remaining requests are spread evenly over the time left in the window, with a
+small burst allowance, so the tools can run at the full allowed rate without
+running out of requests halfway through a window.
+
+When reddit does complain, every caller backs off together, for as long as the
+headers say or, failing that, for an exponentially growing interval.
+
+The limiter is thread safe, so concurrent requests all draw from the same bucket.
+"""
+
+import logging
+import threading
+import time
+
+from prawcore.exceptions import TooManyRequests
+
+printer = logging.getLogger(__name__)
+
+# Reddit allows 100 requests per minute for OAuth clients
+DEFAULT_RATE = 100 / 60
+BURST = 10
+MIN_BACKOFF = 10
+MAX_BACKOFF = 600
+
+
+class RateLimiter:
+    """A token bucket whose refill rate follows reddit's rate limit headers"""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.resume_at = 0
+        self.backoff = 0
+        self.requests = 0
+        self.times_limited = 0
+        self.time_slept = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def _sleep(self, seconds):
+        if seconds <= 0:
+            return
+        printer.debug("Sleeping for %.2fs to stay under the rate limit", seconds)
+        with self._lock:
+            self.time_slept += seconds
+        time.sleep(seconds)
+
+    def acquire(self):
+        """Wait until there's a token available, and take it"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Tokens can go negative, which reserves a slot in the queue of
+            # waiting requests
+            self.tokens -= 1
+            self.requests += 1
+            delay = max(-self.tokens / self.rate, self.resume_at - now)
+        self._sleep(delay)
+
+    def update(self, headers):
+        """Adjust the refill rate to what reddit says is left of the current window"""
+        if "x-ratelimit-remaining" not in headers:
+            return
+        remaining = float(headers["x-ratelimit-remaining"])
+        seconds_to_reset = max(float(headers["x-ratelimit-reset"]), 1)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.backoff = 0
+            if remaining < 1:
+                self.resume_at = max(self.resume_at, now + seconds_to_reset)
+                self.rate = DEFAULT_RATE
+                self.tokens = min(self.tokens, 0)
+            else:
+                self.rate = remaining / seconds_to_reset
+                self.tokens = min(self.tokens, remaining)
+
+    def back_off(self, response=None):
+        """
+        Record that reddit rejected a request for going too fast, and wait
+        until it's worth trying again.
+
+        The wait is taken from the rate limit headers of the rejected response
+        if they're available, and otherwise grows with every rejection until a
+        request succeeds.
+        """
+        headers = getattr(response, "headers", {})
+        with self._lock:
+            now = time.monotonic()
+            self.times_limited += 1
+            if "x-ratelimit-reset" in headers:
+                pause = max(float(headers["x-ratelimit-reset"]), 1)
+            else:
+                self.backoff = min(max(2 * self.backoff, MIN_BACKOFF), MAX_BACKOFF)
+                pause = self.backoff
+            self.resume_at = max(self.resume_at, now + pause)
+            self.tokens = min(self.tokens, 0)
+            delay = self.resume_at - now
+        printer.warning("Getting rate limited. Sleeping for %.0fs", delay)
+        self._sleep(delay)
+
+    def call(self, request_function, set_header_callback, *args, **kwargs):
+        """
+        Make a request through the limiter. Same interface as prawcore's
+        RateLimiter: the method and url are passed on to `request_function`,
+        either positionally or as keywords.
+        """
+        self.acquire()
+        kwargs["headers"] = set_header_callback()
+        response = request_function(*args, **kwargs)
+        self.update(response.headers)
+        return response
+
+    @property
+    def stats(self):
+        """
+        How many requests have been made, how often reddit has rejected one,
+        and the total time spent waiting, summed over all threads.
+        """
+        return {
+            "requests": self.requests,
+            "times_limited": self.times_limited,
+            "time_slept": self.time_slept,
+        }
+
+    def summary(self):
+        return (
+            f"Made {self.requests} requests to reddit, got rate limited {self.times_limited} "
+            f"times and slept for {self.time_slept:.1f}s"
+        )
+
+
+def install(reddit, rate_limiter=None):
+    """Route every request made by a praw reddit instance through `rate_limiter`"""
+    rate_limiter = limiter if rate_limiter is None else rate_limiter
+    # pylint: disable=protected-access
+    for core in (reddit._read_only_core, reddit._authorized_core):
+        if core is not None:
+            core._rate_limiter = rate_limiter
+
+
+def retry(function, *args, **kwargs):
+    """Call `function`, backing off and trying again for as long as reddit says to slow down"""
+    while True:
+        try:
+            return function(*args, **kwargs)
+        except TooManyRequests as e:
+            limiter.back_off(e.response)
+
+
+limiter = RateLimiter()
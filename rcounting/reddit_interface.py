@@ -12,6 +12,8 @@ from importlib.metadata import version
 import praw
 import praw.exceptions
 
+from rcounting import async_reddit, comment_cache, rate_limit
+
 # The tools work with OAuth access and refresh tokens, so you need to grant
 # access. Once you've done that, they token will be stored in a file for future
 # use.
@@ -105,14 +107,57 @@ reddit = praw.Reddit(
     client_id=_CLIENT_ID, user_agent=_USER_AGENT, client_secret=None, refresh_token=refresh_token
 )
 
+rate_limit.install(reddit)
+
 subreddit = reddit.subreddit("counting")
 reddit.validate_on_submit = True
 
 
 def extract_from_short_link(url):
+    return resolve_short_links([url])[url]
+
+
+def _resolve_short_link(url):
     try:
         comment = reddit.comment(url=url)
         return comment.submission.id, comment.id
     except praw.exceptions.InvalidURL:
         submission = reddit.submission(url=url)
         return submission.id, None
+
+
+# Short links resolved by this process, for when the persistent cache is disabled
+_short_links = {}
+# Batches smaller than this aren't worth starting an event loop for
+MIN_CONCURRENT_LINKS = 3
+
+
+def resolve_short_links(urls):
+    """
+    Resolve a collection of short links to (submission_id, comment_id) tuples,
+    returned as a dictionary indexed by url.
+
+    Links that have been seen before are looked up in the comment cache, and
+    all the others are resolved and added to it. Larger batches are resolved
+    concurrently.
+    """
+    cache = comment_cache.default_cache()
+    urls = list(dict.fromkeys(urls))
+    result = {x: _short_links[x] for x in urls if x in _short_links}
+    missing = [x for x in urls if x not in result]
+    if cache is not None and missing:
+        result |= cache.get_short_links(missing)
+        missing = [x for x in urls if x not in result]
+    if len(missing) >= MIN_CONCURRENT_LINKS:
+
+        async def resolve(client):
+            return await client.map(_resolve_short_link, missing)
+
+        resolved = dict(zip(missing, async_reddit.run(resolve, reddit)))
+    else:
+        resolved = {x: rate_limit.retry(_resolve_short_link, x) for x in missing}
+    if cache is not None and resolved:
+        cache.add_short_links(resolved)
+    result |= resolved
+    _short_links.update(result)
+    return result
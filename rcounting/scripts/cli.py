@@ -5,6 +5,8 @@ See the subcommands for details on their behaviour.
 
 import click
 
+from .db import db
+from .export import export
 from .ftf import pin_or_create_ftf
 from .log_all_side_threads import main
 from .log_thread import log
@@ -21,6 +23,8 @@ from .weekly_side_thread_stats import generate_stats_post
         pin_or_create_ftf,
         generate_stats_post,
         main,
+        db,
+        export,
     ],
     context_settings=dict(help_option_names=["-h", "--help"]),
 )
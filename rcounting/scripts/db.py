@@ -0,0 +1,39 @@
+# pylint: disable=import-outside-toplevel
+"""Maintenance commands for the databases written by the logging scripts"""
+
+import logging
+from pathlib import Path
+
+import click
+
+printer = logging.getLogger("rcounting")
+
+
+@click.group(name="db")
+def db():
+    """Maintain the databases written by `rcounting log` and `rcounting log-side-threads`."""
+
+
+@db.command()
+@click.option(
+    "--filename",
+    "-f",
+    type=click.Path(path_type=Path, exists=True, dir_okay=False),
+    help="The database to repair. If none is specified, counting.sqlite is used.",
+    default="counting.sqlite",
+)
+@click.option("--verbose", "-v", count=True, help="Print more output")
+@click.option("--quiet", "-q", is_flag=True, default=False, help="Suppress output")
+def dedupe(filename, verbose, quiet):
+    """
+    Remove duplicate comments and submissions from a logging database, and add
+    the unique keys that stop new duplicates from being written.
+    """
+    from rcounting import configure_logging, io
+
+    configure_logging.setup(printer, verbose, quiet)
+    connection = io.connect(filename)
+    removed = io.deduplicate(connection)
+    for table, n_rows in removed.items():
+        printer.info("Removed %s duplicate rows from %s", n_rows, table)
+    connection.execute("VACUUM")
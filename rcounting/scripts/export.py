@@ -0,0 +1,44 @@
+# pylint: disable=import-outside-toplevel
+"""Export a logging database to parquet files for analysis"""
+
+import logging
+from pathlib import Path
+
+import click
+
+printer = logging.getLogger("rcounting")
+
+
+@click.command()
+@click.option(
+    "--filename",
+    "-f",
+    type=click.Path(path_type=Path, exists=True, dir_okay=False),
+    help="The database to export. If none is specified, counting.sqlite is used.",
+    default="counting.sqlite",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(path_type=Path, file_okay=False),
+    help="The directory to write to. Defaults to the name of the database with _parquet added.",
+)
+@click.option("--verbose", "-v", count=True, help="Print more output")
+@click.option("--quiet", "-q", is_flag=True, default=False, help="Suppress output")
+def export(filename, output, verbose, quiet):
+    """
+    Export the comments, submissions and counters tables of a logging
+    database to parquet files, partitioned by thread and year.
+
+    Load the result with `rcounting.analysis.load_parquet`. This needs
+    pyarrow, which is part of the analysis extras.
+    """
+    import sqlite3
+
+    from rcounting import configure_logging, io
+
+    configure_logging.setup(printer, verbose, quiet)
+    if output is None:
+        output = filename.with_name(f"{filename.stem}_parquet")
+    printer.info("Exporting %s to %s", filename, output)
+    io.export_parquet(sqlite3.connect(filename), output)
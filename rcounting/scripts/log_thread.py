@@ -2,7 +2,6 @@
 """Script for logging reddit submissions to either a database or a csv file"""
 
 import logging
-import time
 from datetime import datetime
 from pathlib import Path
 
@@ -85,6 +84,7 @@ def log_undecorated(
     from rcounting import thread_directory as td
     from rcounting import thread_navigation as tn
     from rcounting.io import ThreadLogger, update_counters_table
+    from rcounting.rate_limit import limiter
     from rcounting.reddit_interface import reddit, subreddit
 
     # Create the output directory if it doesn't already exist.
@@ -115,38 +115,54 @@ def log_undecorated(
     submission = comment.submission
     submission_id = None
     comment_id = comment.id
-    multiple = 1
-    while (not all_counts and (completed < n_threads)) or (
-        all_counts and submission.id != threadlogger.last_checkpoint
-    ):
-        printer.info("Logging %s", submission.title)
-        if not threadlogger.is_already_logged(submission):
-            try:
-                if submission_id is not None:
-                    comment = tn.find_get_in_submission(
-                        submission_id, comment_id, validate_get=not side_thread
-                    )
-                df = pd.DataFrame(tn.fetch_comments(comment))
-                threadlogger.log(comment, df)
-            except TooManyRequests:
-                printer.warning(
-                    f"Getting rate limited. Sleeping for {30 * multiple} seconds and trying again"
+    # If an earlier run was interrupted, the journal remembers the gets and
+    # links it found, so none of that has to be fetched from reddit again.
+    journal = threadlogger.journal
+    try:
+        while (not all_counts and (completed < n_threads)) or (
+            all_counts and submission.id != threadlogger.last_checkpoint
+        ):
+            entry = journal.get(submission.id) or {}
+            title = entry.get("title") or submission.title
+            printer.info("Logging %s", title)
+            if not threadlogger.is_already_logged(submission):
+                try:
+                    # The first submission is logged from the comment we were given
+                    if submission_id is not None and entry.get("get_id") is not None:
+                        comment = reddit.comment(entry["get_id"])
+                    elif submission_id is not None:
+                        comment = tn.find_get_in_submission(
+                            submission_id, comment_id, validate_get=not side_thread
+                        )
+                    df = pd.DataFrame(tn.fetch_comments(comment))
+                    threadlogger.log(comment, df)
+                except TooManyRequests as e:
+                    limiter.back_off(e.response)
+                    continue
+            else:
+                printer.info("Submission %s has already been logged!", title)
+
+            if submission.id in first_submissions:
+                break
+
+            if entry.get("previous_submission_id") is not None:
+                submission_id = entry["previous_submission_id"]
+                comment_id = entry["previous_get_id"]
+            else:
+                submission_id, comment_id = tn.find_previous_submission(submission)
+                journal.record(
+                    submission.id,
+                    title=title,
+                    previous_submission_id=submission_id,
+                    previous_get_id=comment_id,
                 )
-                time.sleep(30 * multiple)
-                multiple *= 1.5
-                continue
-        else:
-            printer.info("Submission %s has already been logged!", submission.title)
-
-        if submission.id in first_submissions:
-            break
-
-        submission_id, comment_id = tn.find_previous_submission(submission)
-        submission = reddit.submission(submission_id)
-
-        multiple = 1
-        completed += 1
+            submission = reddit.submission(submission_id)
 
+            completed += 1
+    finally:
+        # Whatever happens, don't throw away the comments that have been fetched
+        threadlogger.flush()
+    journal.clear()
     if completed:
         update_counters_table(threadlogger.db)
         if submission.id in first_submissions + [threadlogger.last_checkpoint]:
@@ -155,3 +171,4 @@ def log_undecorated(
         printer.info("The database is already up to date!")
     if print_timing:
         printer.info("Running the script took %s", datetime.now() - t_start)
+        printer.info(limiter.summary())
@@ -30,18 +30,33 @@ spurious_nodes = ("12x4vpl", "13s4tu6", "1nz6oi8")
 )
 @click.option("-v", "--verbose", count=True, help="Print more output")
 @click.option("-q", "--quiet", is_flag=True)
-@click.option("--sleep", default=0)
+@click.option(
+    "--sleep",
+    default=0,
+    hidden=True,
+    help="Deprecated. Requests are paced by the shared rate limiter instead.",
+)
+@click.option(
+    "--workers",
+    "-w",
+    default=1,
+    type=click.IntRange(min=1),
+    help="How many rows of the directory to update in parallel",
+)
 @click.option("--allow-archive/--no-allow-archive", default=True)
-def update_directory(quiet, verbose, dry_run, sleep, allow_archive):
+def update_directory(quiet, verbose, dry_run, sleep, workers, allow_archive):
     """
     Update the thread directory located at reddit.com/r/counting/wiki/directory.
     """
 
     from rcounting import thread_directory as td
     from rcounting import thread_navigation as tn
+    from rcounting.rate_limit import limiter
     from rcounting.reddit_interface import subreddit
 
     configure_logging.setup(printer, verbose, quiet)
+    if sleep:
+        printer.warning("--sleep is deprecated and has no effect")
     start = datetime.datetime.now()
     printer.info("Getting history")
     tree, new_submissions = tn.fetch_counting_history(subreddit, datetime.timedelta(days=187))
@@ -57,7 +72,7 @@ def update_directory(quiet, verbose, dry_run, sleep, allow_archive):
     directory = td.load_wiki_page(subreddit, "directory", allow_archive=allow_archive)
     archive = td.load_wiki_page(subreddit, "directory/archive", kind="archive")
     directory.set_archive(archive)
-    directory.update(tree, new_submission_ids, sleep)
+    directory.update(tree, new_submission_ids, workers)
 
     if not dry_run:
         subreddit.wiki["directory"].edit(content=str(directory), reason="Ran the update script")
@@ -76,3 +91,4 @@ def update_directory(quiet, verbose, dry_run, sleep, allow_archive):
                 print(archive, file=f)
     end = datetime.datetime.now()
     printer.info("Running the script took %s", end - start)
+    printer.info(limiter.summary())
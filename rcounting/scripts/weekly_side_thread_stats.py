@@ -48,11 +48,14 @@ def get_directory_counts(reddit, directory, ftf_timestamp, db):
         completed_rows = list(df["thread_id"])
     except pd.io.sql.DatabaseError:
         completed_rows = []
-    for row in directory.rows[1:]:
-        if row.first_submission in completed_rows:
-            continue
+    rows = [row for row in directory.rows[1:] if row.first_submission not in completed_rows]
+    # Looking up the latest comment of every row in one go saves a request per row
+    comment_ids = [row.comment_id for row in rows if row.comment_id]
+    latest_comments = {x.id: x for x in models.fetch_comments_by_id(reddit, comment_ids)}
+    for row in rows:
         printer.info("Getting latest history for %s", row.name)
-        tree = models.CommentTree(reddit=reddit, get_missing_replies=False)
+        seed = [latest_comments[row.comment_id]] if row.comment_id in latest_comments else []
+        tree = models.CommentTree(seed, reddit=reddit, get_missing_replies=False)
         comments = tree.walk_up_tree(row.comment_id, cutoff=threshold) or []
         tree.add_missing_replies(row.comment_id, limit=10)
         st = side_threads.get_side_thread(row.thread_type)
@@ -72,7 +75,7 @@ def get_directory_counts(reddit, directory, ftf_timestamp, db):
     combined = pd.concat([completed_threads, partial_threads])
     return combined.loc[
         (~combined["username"].apply(is_banned_counter)) & (combined["timestamp"] <= ftf_timestamp)
-    ].drop_duplicates()
+    ].drop_duplicates("comment_id")
 
 
 def get_weekly_stats(reddit, subreddit, ftf_timestamp, filename):
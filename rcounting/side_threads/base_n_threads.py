@@ -7,7 +7,7 @@ from fuzzywuzzy import fuzz
 
 from rcounting import parsing
 
-from .forms import CommentType
+from .forms import CommentType, map_unique
 from .validate_form import alphanumeric, validate_from_tokens
 
 
@@ -78,6 +78,7 @@ class BaseN(CommentType):
             idx + int(bijective): symbol for idx, symbol in enumerate(self.tokens)
         }
         self.bijective = bijective
+        self.simple = simple
         self.form = validate_from_tokens(self.tokens)
         self.base = len(tokens)
         if simple:
@@ -105,6 +106,23 @@ class BaseN(CommentType):
             tokenizer=self.tokenizer,
         )
 
+    def comment_to_counts(self, bodies):
+        if not self.simple:
+            return super().comment_to_counts(bodies)
+        extractor = parsing.count_extractor(self.base, self.bijective)
+        return map_unique(extractor.extract_many(bodies), self.string_to_count)
+
+    def string_to_count(self, count_string):
+        """Convert an extracted count string in the simple alphabet to an integer"""
+        if not self.bijective:
+            return int(count_string, self.base)
+        return count_from_token_list(
+            count_string,
+            alphabet=self.tokens,
+            bijective=True,
+            tokenizer=lambda body, _: list(body),
+        )
+
     def count_to_comment(self, count: int) -> str:
         if self.bijective:
             f = lambda x: int(ceil(x)) - 1  # noqa
@@ -1,6 +1,11 @@
+import hashlib
 import itertools
+import logging
 import math
-from collections import Counter, defaultdict
+import os
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from pathlib import Path
 from typing import Sequence, Tuple
 
 import numpy as np
@@ -8,10 +13,40 @@ import scipy.sparse
 
 from rcounting import parsing
 
-from .forms import CommentType
+from .forms import CommentType, map_unique
 from .side_threads import SideThread
 from .validate_form import alphanumeric, base_n
 
+printer = logging.getLogger(__name__)
+
+# Bump this whenever a change to the DFAs would change the contents of the
+# cached tables, so that stale files are ignored
+DFA_CACHE_VERSION = 2
+INT64_MAX = np.iinfo(np.int64).max
+
+
+def default_cache_directory():
+    """
+    Where the precomputed DFA tables are stored. Returns None if the cache has
+    been disabled.
+    """
+    cache_home = Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache"))
+    path = os.getenv("rcounting_dfa_cache", cache_home / "rcounting" / "dfa")
+    return Path(path) if path else None
+
+
+def exact_product(matrix, vector):
+    """
+    Multiply a (possibly sparse) integer matrix by a vector of python ints,
+    without any risk of overflow.
+    """
+    if not scipy.sparse.issparse(matrix):
+        return np.asarray(matrix).astype(object) @ vector
+    matrix = matrix.tocoo()
+    result = np.zeros(matrix.shape[0], dtype=object)
+    np.add.at(result, matrix.row, matrix.data.astype(object) * vector[matrix.col])
+    return result
+
 
 def base_n_encode(count, base):
     result = []
@@ -41,12 +76,21 @@ class DFA:
     def __getitem__(self, i):
         if self.transitions is None:
             self.transitions = [self.generate_identity()]
-            self.transition_matrix = self.generate_transition_matrix()
         while len(self.transitions) <= i:
-            self.transitions.append(self.transitions[-1] @ self.transition_matrix)
+            self.transitions.append(self.transitions[-1] @ self.get_transition_matrix())
 
         return self.transitions[i]
 
+    def get_transition_matrix(self):
+        if self.transition_matrix is None:
+            self.transition_matrix = self.generate_transition_matrix()
+        return self.transition_matrix
+
+    @property
+    def key(self):
+        """A name for the DFA and its parameters, used to label cached tables"""
+        return f"{type(self).__name__}-{self.n_symbols}-{self.n_states}-{self.size}"
+
     def generate_identity(self):
         if self.sparse:
             return scipy.sparse.eye(self.size, dtype=int, format="csc")
@@ -383,6 +427,8 @@ class DFAType(CommentType):
 
     """
 
+    prefix_cache_size = 10000
+
     def __init__(
         self,
         dfa_base=3,
@@ -396,7 +442,10 @@ class DFAType(CommentType):
         self.dfa = dfa if dfa is not None else DFA(n, dfa_base)
         self.indices = indices if indices is not None else []
         self.encoded_symbols = [self.dfa.encode(s) for s in alphanumeric[:n]]
-        self.matrices = {}
+        self.matrices = None
+        self.exact_matrices = []
+        self.prefix_totals = OrderedDict()
+        self.lock = threading.RLock()
 
         # Some of the threads skip the single-digit counts which would
         # otherwhise be valid, so we add an offset to account for that
@@ -405,34 +454,152 @@ class DFAType(CommentType):
         super().__init__(form=form, comment_to_count=self.count)
 
     def matrix(self, n):
-        if n not in self.matrices:
-            matrix = self.dfa[n][:, self.indices]
-            if scipy.sparse.issparse(matrix):
-                matrix = matrix.toarray()
-            self.matrices[n] = matrix.sum(axis=1)
-        return self.matrices[n]
+        """
+        For each state, how many ways there are of getting from it to one of
+        the valid states by appending n characters.
+
+        Row n is the transition matrix applied to row n - 1, so the rows are
+        built up one matrix-vector product at a time instead of by taking
+        powers of the transition matrix. They are stored on disk in the DFA
+        cache directory and loaded the first time they're needed, so that
+        every process doesn't have to generate the transition matrix again.
+
+        The rows grow exponentially with n. As long as every entry is at most
+        `int_limit`, they're stored as int64 arrays; after that they're kept
+        as object arrays of python ints, which are exact but much slower.
+        Only the int64 rows are stored on disk.
+        """
+        with self.lock:
+            if self.matrices is None:
+                self.matrices = self.load_matrices()
+            if n >= len(self.matrices) + len(self.exact_matrices):
+                self.extend_matrices(n)
+            if n < len(self.matrices):
+                return self.matrices[n]
+            return self.exact_matrices[n - len(self.matrices)]
+
+    @property
+    def int_limit(self):
+        """
+        The largest table entry that's safe to use in int64 arithmetic.
+
+        Appending a character can take a state to at most n_symbols other
+        states, and `_enumerate` sums at most n + 1 entries of a row, so
+        neither the next row nor any enumeration can overflow if every entry
+        is below this limit.
+        """
+        return INT64_MAX // (max(self.dfa.n_symbols, self.n) + 1)
+
+    @property
+    def cache_path(self):
+        directory = default_cache_directory()
+        if directory is None:
+            return None
+        indices = ",".join(str(x) for x in sorted(self.indices))
+        digest = hashlib.sha1(indices.encode()).hexdigest()[:16]
+        return directory / f"v{DFA_CACHE_VERSION}-{self.dfa.key}-{digest}.npy"
+
+    def load_matrices(self):
+        path = self.cache_path
+        if path is not None and path.exists():
+            try:
+                matrices = np.load(path, mmap_mode="r")
+                if matrices.ndim == 2 and matrices.shape[1] == self.dfa.size:
+                    return matrices
+            except (OSError, ValueError) as e:
+                printer.warning("Ignoring unreadable DFA cache at %s: %s", path, e)
+        initial = np.zeros((1, self.dfa.size), dtype=np.int64)
+        np.add.at(initial[0], self.indices, 1)
+        return initial
+
+    def extend_matrices(self, n):
+        transition_matrix = self.dfa.get_transition_matrix()
+        rows = [np.asarray(self.matrices[-1])]
+        while not self.exact_matrices and len(self.matrices) + len(rows) <= n + 1:
+            row = transition_matrix @ rows[-1]
+            if row.max() > self.int_limit:
+                self.exact_matrices.append(row.astype(object))
+            else:
+                rows.append(row)
+        if len(rows) > 1:
+            self.matrices = np.concatenate([self.matrices, np.stack(rows[1:])])
+            self.save_matrices()
+        while len(self.matrices) + len(self.exact_matrices) <= n:
+            self.exact_matrices.append(exact_product(transition_matrix, self.exact_matrices[-1]))
+
+    def save_matrices(self):
+        path = self.cache_path
+        if path is None:
+            return
+        temporary_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temporary_path, "wb") as f:
+                np.save(f, self.matrices)
+            os.replace(temporary_path, path)
+        except OSError as e:
+            printer.warning("Unable to save DFA cache to %s: %s", path, e)
 
     def word_is_valid(self, word):
         return self.dfa.encode(word) in self.indices
 
     def count(self, comment_body: str, bijective=False) -> int:
         word = parsing.extract_count_string(comment_body, self.n).lower()
-        word_length = len(word)
+        return self.word_to_count(word, bijective)
 
-        enumeration = 0
-        for i in range(word_length - 1, -1, -1):
-            matrix_power = word_length - 1 - i
-            prefix = word[:i]
-            current_char = word[i]
-            suffixes = alphanumeric[i == 0 : alphanumeric.index(current_char)]
-            states = [self.dfa.encode(prefix + suffix) for suffix in suffixes]
-            if bijective:
-                states += [self.dfa.encode("")]
-            elif matrix_power > 0:
-                enumeration += self._enumerate(self.encoded_symbols[1:], matrix_power - 1)
-            enumeration += self._enumerate(states, matrix_power)
+    def comment_to_counts(self, bodies):
+        words = parsing.count_extractor(self.n).extract_many(bodies)
+        return map_unique(words, self.word_to_count)
+
+    def word_to_count(self, word: str, bijective=False) -> int:
+        """How many valid words are there that come before or are equal to `word`?"""
+        with self.lock:
+            enumeration = self.prefix_total(word, len(word), bijective)
         return enumeration + self.word_is_valid(word) - self.offset
 
+    def prefix_total(self, prefix: str, word_length: int, bijective=False) -> int:
+        """
+        How many valid words come before a word of length `word_length`
+        starting with `prefix`, not counting the words that start with `prefix`
+        themselves.
+
+        Each position of a word contributes a term which only depends on the
+        characters up to that position and on the length of the word, so the
+        running totals are cached per prefix. Consecutive counts in a thread
+        share all but their last few characters, which means that counting a
+        new comment usually only has to do the work for those.
+        """
+        start = len(prefix)
+        while start > 0 and (prefix[:start], word_length, bijective) not in self.prefix_totals:
+            start -= 1
+        total = 0
+        if start > 0:
+            key = (prefix[:start], word_length, bijective)
+            total = self.prefix_totals[key]
+            self.prefix_totals.move_to_end(key)
+        for i in range(start, len(prefix)):
+            total += self._position_total(prefix[:i], prefix[i], word_length - 1 - i, bijective)
+            self.prefix_totals[prefix[: i + 1], word_length, bijective] = total
+        while len(self.prefix_totals) > self.prefix_cache_size:
+            self.prefix_totals.popitem(last=False)
+        return total
+
+    def _position_total(self, prefix, current_char, matrix_power, bijective):
+        """
+        How many valid words start with `prefix`, continue with a character
+        smaller than `current_char` and are followed by `matrix_power` more
+        characters. Unless the count is bijective, this also includes the
+        valid words which are `matrix_power` characters long.
+        """
+        suffixes = alphanumeric[not prefix : alphanumeric.index(current_char)]
+        states = [self.dfa.encode(prefix + suffix) for suffix in suffixes]
+        enumeration = 0
+        if bijective:
+            states += [self.dfa.encode("")]
+        elif matrix_power > 0:
+            enumeration += self._enumerate(self.encoded_symbols[1:], matrix_power - 1)
+        return enumeration + self._enumerate(states, matrix_power)
+
     def count_to_comment(self, count: int) -> str:
         target = count
         current = count
@@ -460,7 +627,7 @@ class DFAType(CommentType):
         if not states:
             return 0
         states, counts = zip(*Counter(states).items())
-        return np.dot(counts, self.matrix(n)[list(states)])
+        return int(np.dot(counts, self.matrix(n)[list(states)]))
 
 
 dfa_10_2 = DFA(10, 2)
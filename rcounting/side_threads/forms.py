@@ -61,6 +61,19 @@ class CommentType:
         except ValueError:
             return np.nan
 
+    def comment_to_counts(self, bodies):
+        """
+        Convert a pandas Series of comment bodies to counts, with NaN for the
+        comments where that isn't possible.
+
+        This is the batch version of `wrapped_comment_to_count`. Comment types
+        which can do better than converting one comment at a time should
+        override it.
+        """
+        if self.comment_to_count in (None, parsing.find_count_in_text):
+            return parsing.extract_counts(bodies)
+        return bodies.apply(self.wrapped_comment_to_count)
+
     def find_errors(self, history, offset=0):
         """Find points in the history of a side thread where an incorrect count was posted.
 
@@ -76,7 +89,7 @@ class CommentType:
         Returns:
           - The comments in the history where an uncorrected error was introduced
 
-        In order to do this, we need to use the `comment_to_count` member of
+        In order to do this, we need to use the `comment_to_counts` member of
         the side thread to go from the string representation of a comment to
         the corresponding count. This is potentially different for each side
         thread.
@@ -97,10 +110,12 @@ class CommentType:
 
         """
         if isinstance(history, str):
-            self.history = pd.DataFrame(tn.fetch_comments(history))
-            history = self.history
+            # Side thread objects are shared between threads, so the fetched
+            # history is only read back from the local variable
+            history = pd.DataFrame(tn.fetch_comments(history))
+            self.history = history
 
-        counts = history["body"].apply(self.wrapped_comment_to_count)
+        counts = self.comment_to_counts(history["body"])
         # Errors are points where the count doesn't match the index difference
         errors = counts - counts.iloc[0] - offset != counts.index
         # But only errors after the last correct value are interesting
@@ -153,4 +168,13 @@ class CommentType:
         return self.count_to_comment(target_count)
 
 
+def map_unique(strings, string_to_count):
+    """
+    Apply `string_to_count` to a Series of count strings, only evaluating it
+    once for each distinct string. Missing strings give NaN.
+    """
+    mapping = {x: string_to_count(x) for x in strings.dropna().unique()}
+    return strings.map(mapping)
+
+
 default_type = CommentType()
@@ -4,12 +4,51 @@ from rcounting.models import comment_to_dict
 from rcounting.units import HOUR, MINUTE
 
 
+class HistoryWindow:
+    """
+    An immutable linked list of the latest comments in a chain, newest first.
+
+    Adding a comment makes a new head pointing at the old one, so sibling
+    branches share everything before the point where they split. Once a list
+    has grown to twice the size it had after it was last trimmed, the part a
+    rule still needs is copied into a fresh list and the rest can be freed,
+    which keeps the memory used by each branch bounded by the rule's look-back.
+    """
+
+    __slots__ = ("username", "timestamp", "previous", "length", "base_length")
+
+    def __init__(self, username, timestamp, previous=None, base_length=None):
+        self.username = username
+        self.timestamp = timestamp
+        self.previous = previous
+        self.length = 1 if previous is None else previous.length + 1
+        if base_length is None:
+            base_length = 1 if previous is None else previous.base_length
+        self.base_length = base_length
+
+    def __iter__(self):
+        node = self
+        while node is not None:
+            yield node
+            node = node.previous
+
+    @classmethod
+    def from_entries(cls, entries):
+        """Build a new window from a list of entries, newest first"""
+        window = None
+        for entry in entries[::-1]:
+            window = cls(entry.username, entry.timestamp, window, base_length=len(entries))
+        return window
+
+
 class CountingRule:
     """
-    A rules class. It knows how to do two things:
+    A rules class. It knows how to do three things:
 
     - Get enough history to see whether a given comment is valid
     - Determine whether all counts in a history of counts are valid.
+    - Validate a stream of comments one at a time, looking only at the window
+      of previous comments given by `lookback` instead of the full history.
 
     Examples of things it's intended to validate are:
       - That users waited enough time since their own last comment before commenting again
@@ -49,10 +88,63 @@ class CountingRule:
             & self._valid_user_time(history)
         )
 
+    def _valid_elapsed_time(self, elapsed_time):
+        return not self.thread_time or elapsed_time >= self.thread_time
+
+    @property
+    def lookback(self):
+        """
+        How far back the rule needs to look to validate a comment, as a tuple
+        (number of comments, seconds). A comment is needed if it's within either
+        limit, and a number of None means the whole chain is needed.
+        """
+        return self.n, max(self.thread_time, self.user_time)
+
+    def _window(self, window, timestamp):
+        """Yield (depth, entry) for the entries that can affect a comment made at `timestamp`"""
+        count, max_time = self.lookback
+        for depth, entry in enumerate(window or []):
+            if count is not None and depth >= count and timestamp - entry.timestamp >= max_time:
+                return
+            yield depth, entry
+
+    def _push(self, window, username, timestamp):
+        window = HistoryWindow(username, timestamp, window)
+        if window.length >= 2 * window.base_length + 8:
+            entries = [entry for _, entry in self._window(window.previous, timestamp)]
+            window = HistoryWindow.from_entries([window] + entries)
+        return window
+
+    def initial_state(self, history):
+        """Build the state corresponding to a history of comments which are known to be valid"""
+        window = None
+        for row in history.to_dict("records"):
+            window = self._push(window, row["username"], row["timestamp"])
+        return window
+
+    def advance(self, state, comment):
+        """
+        Check whether `comment` is a valid continuation of the comments in the
+        `HistoryWindow` `state`.
+
+        Returns a tuple (is_valid, new_state), where `new_state` includes the comment.
+        """
+        username = str(comment.author)
+        timestamp = comment.created_utc
+        is_valid = state is None or self._valid_elapsed_time(timestamp - state.timestamp)
+        for depth, entry in self._window(state, timestamp):
+            if entry.username != username:
+                continue
+            if self.n is None or depth < self.n:
+                is_valid = False
+            if self.user_time and timestamp - entry.timestamp < self.user_time:
+                is_valid = False
+        return is_valid, self._push(state, username, timestamp)
+
     def get_history(self, comment):
-        limit = self.n + 1 if self.n is not None else self.n
+        count, max_time = self.lookback
+        limit = count + 1 if count is not None else count
         comments = comment.walk_up_tree(limit=limit)
-        max_time = max(self.thread_time, self.user_time)
         while (
             not comments[-1].is_root
             and (comment.created_utc - comments[-1].created_utc) < max_time
@@ -72,6 +164,9 @@ class FastOrSlow(CountingRule):
     def __init__(self):
         super().__init__()
 
+    def _valid_elapsed_time(self, elapsed_time):
+        return elapsed_time < 5 * MINUTE or elapsed_time >= HOUR
+
     def _valid_thread_time(self, history):
         elapsed_time = history["timestamp"].diff()
         valid_time = elapsed_time.isna() | (elapsed_time < 5 * MINUTE) | (elapsed_time >= HOUR)
@@ -98,9 +193,30 @@ class OnlyDoubleCounting(CountingRule):
         history.reset_index(inplace=True)
         return history["mask"]
 
-    def get_history(self, comment):
-        comments = comment.walk_up_tree(limit=2)[:0:-1]
-        return pd.DataFrame([comment_to_dict(x) for x in comments])
+    def initial_state(self, history):
+        """
+        The state is the latest user, how many times in a row they've
+        counted, and whether the start of that run is known.
+        """
+        usernames = list(history["username"]) if len(history) else []
+        if not usernames:
+            return (None, 0, True)
+        run = 1
+        while run < len(usernames) and usernames[-run - 1] == usernames[-1]:
+            run += 1
+        return (usernames[-1], run, run < len(usernames))
+
+    def advance(self, state, comment):
+        last_user, run, run_is_exact = state
+        username = str(comment.author)
+        if username == last_user:
+            return run < 2, (username, run + 1, run_is_exact)
+        is_valid = last_user is None or run == 2 or (run == 1 and not run_is_exact)
+        return is_valid, (username, 1, True)
+
+    @property
+    def lookback(self):
+        return 1, 0
 
 
 default_rule = CountingRule()
@@ -1,9 +1,6 @@
 import logging
 
-import pandas as pd
-
 from rcounting import counters
-from rcounting.models import comment_to_dict
 
 from .forms import default_type
 from .rules import default_rule
@@ -52,12 +49,19 @@ class SideThread:
             return (True, "")
         return (False, history.loc[~mask, "comment_id"].iloc[0])
 
-    def is_valid_count(self, comment, history):
-        history = pd.concat([history, pd.DataFrame([comment_to_dict(comment)])], ignore_index=True)
-        valid_history = self.is_valid_thread(history)[0]
+    def is_valid_count(self, comment, state):
+        """
+        Check whether `comment` is a valid count following the comments
+        summarised by `state`, as returned by `validation_state`.
+
+        Returns a tuple (is_valid, new_state). Validating a comment only looks
+        at the comments within the look-back of the rule, so the cost doesn't
+        depend on the length of the thread.
+        """
+        valid_history, state = self.rule.advance(state, comment)
         valid_count = self.looks_like_count(comment.body)
         valid_user = not counters.is_ignored_counter(str(comment.author))
-        return valid_history and valid_count and valid_user, history
+        return valid_history and valid_count and valid_user, state
 
     def get_history(self, comment):
         """Fetch enough previous comments to be able to determine whether replies to
@@ -65,6 +69,10 @@ class SideThread:
         """
         return self.rule.get_history(comment)
 
+    def validation_state(self, comment):
+        """The validation state needed to check whether replies to `comment` are valid"""
+        return self.rule.initial_state(self.get_history(comment))
+
     def looks_like_count(self, comment_body):
         return self.comment_type.looks_like_count(comment_body)
 
@@ -3,9 +3,9 @@ import copy
 import datetime
 import itertools
 import logging
-import time
+from concurrent.futures import ThreadPoolExecutor
 
-from rcounting import models, parsing, utils
+from rcounting import async_reddit, models, parsing, utils
 from rcounting import side_threads as st
 
 printer = logging.getLogger(__name__)
@@ -154,7 +154,9 @@ class Row:
             return f"~{count:,d}"
         return f"{count:,d}"
 
-    def update(self, submission_tree, deepest_comment=False):
+    def update(
+        self, submission_tree, deepest_comment=False, concurrency=async_reddit.DEFAULT_CONCURRENCY
+    ):
         """Find the latest comment in the latest submission of the side thread
         represented by this row.
 
@@ -177,6 +179,9 @@ class Row:
         posted either as early top-level comments, or as replies to a top level
         comment.
 
+        concurrency: How many requests can be in flight at once when the
+        comments of the submission are fetched.
+
         """
         side_thread = st.get_side_thread(self.thread_type)
         printer.debug("Updating side thread: %s", self.thread_type)
@@ -195,8 +200,7 @@ class Row:
 
         comments = models.CommentTree(reddit=submission_tree.reddit, get_missing_replies=False)
         if deepest_comment:
-            for comment in self.submission.comments:
-                comments.add_missing_replies(comment)
+            comments.expand(self.submission.comments, concurrency=concurrency)
         elif self.comment_id is None:
             comment = next(
                 filter(lambda x: side_thread.looks_like_count(x.body), self.submission.comments)
@@ -315,9 +319,9 @@ class Directory:
         archive = {x.submission_id: x for x in archive.rows}
         self.archive = archive
 
-    def update(self, tree, new_submission_ids, sleep=0):
+    def update(self, tree, new_submission_ids, workers=1):
         printer.info("Updating tables")
-        self.update_existing_rows(tree, sleep)
+        self.update_existing_rows(tree, workers)
         self.add_last_table()
         printer.info("Updating new threads")
         new_submissions = self.find_new_submissions(tree, new_submission_ids)
@@ -335,17 +339,44 @@ class Directory:
             self.updated_archive = True
             self.archive.update({row.submission_id: row for row in archived_rows})
 
-    def update_existing_rows(self, tree, sleep=0):
-        """Update every row in the main directory page"""
-        for row in self.rows:
+    def update_existing_rows(self, tree, workers=1):
+        """
+        Update every row in the main directory page.
+
+        Each row only reads from the submission tree, so independent rows can
+        be updated in parallel by up to `workers` threads. The rows are
+        updated in place, so their order is unaffected. Every row is attempted
+        even if some fail; each failure is logged, and the first one is raised
+        once all the rows have been processed.
+
+        The concurrent requests a row can make are divided between the
+        workers, so that the number of requests in flight stays the same no
+        matter how many workers there are.
+        """
+        concurrency = max(1, async_reddit.DEFAULT_CONCURRENCY // workers)
+
+        def update_row(row):
             try:
-                row.update(tree)
-                if sleep:
-                    time.sleep(sleep)
-            except Exception:  # pylint: disable=broad-except
+                row.update(tree, concurrency=concurrency)
+            except Exception as e:  # pylint: disable=broad-except
                 printer.warning("Unable to update thread %s", row.title)
-                raise
-        self.known_submissions |= {row.submission_id for row in self.rows}
+                return e
+            return None
+
+        rows = self.rows
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                errors = list(executor.map(update_row, rows))
+        else:
+            errors = []
+            for row in rows:
+                errors.append(update_row(row))
+                if errors[-1] is not None:
+                    break
+        errors = [x for x in errors if x is not None]
+        if errors:
+            raise errors[0]
+        self.known_submissions |= {row.submission_id for row in rows}
 
     def add_last_table(self):
         if not self.paragraphs[-3].is_misc_table_heading():
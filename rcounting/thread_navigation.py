@@ -5,7 +5,7 @@ import logging
 from praw.exceptions import DuplicateReplaceException
 from prawcore.exceptions import Forbidden
 
-from rcounting import models, parsing
+from rcounting import comment_cache, models, parsing
 from rcounting.reddit_interface import reddit
 
 printer = logging.getLogger(__name__)
@@ -32,9 +32,28 @@ def find_previous_submission(submission, similarity_threshold=0.6):
     - If there are none, take the first link present
     - If there are none, return (None, None)
 
+    The result is stored in the comment cache together with the candidates
+    it was chosen from, so a submission only has to be resolved once.
     """
 
+    cache = comment_cache.default_cache()
+    if cache is not None:
+        link = cache.get_link(models.extract_id(submission))
+        if link is not None:
+            return link
     submission = submission if hasattr(submission, "id") else reddit.submission(submission)
+    result, evidence = resolve_previous_submission(submission, similarity_threshold)
+    if cache is not None:
+        cache.add_link(submission, result, evidence)
+    return result
+
+
+def resolve_previous_submission(submission, similarity_threshold):
+    """
+    Do the work for `find_previous_submission`, returning the chosen link and
+    a list of [submission_id, get_id, title similarity] for every candidate.
+    """
+    evidence = []
     matcher = difflib.SequenceMatcher()
     matcher.set_seq2(submission.title.split("|")[0])
     result = (None, None)
@@ -53,6 +72,7 @@ def find_previous_submission(submission, similarity_threshold=0.6):
                 result = (previous_submission_id, previous_get_id)
 
             matcher.set_seq1(reddit.submission(previous_submission_id).title.split("|")[0])
+            evidence.append([previous_submission_id, previous_get_id, matcher.ratio()])
         except Forbidden:
             # The link we are looking at is probably for a deleted account. In
             # any case, it's definitely not one we want to be following. We
@@ -66,7 +86,7 @@ def find_previous_submission(submission, similarity_threshold=0.6):
             if not threshold_met and result[1] is None:
                 result = (previous_submission_id, previous_get_id)
                 threshold_met = True
-    return result
+    return result, evidence
 
 
 def find_get_in_submission(submission_id, get_id, validate_get=True):
@@ -117,8 +137,7 @@ def find_deepest_comment(submission, reddit):
         submission = reddit.submission(submission)
         submission.comment_sort = "old"
     comments = models.CommentTree(reddit=reddit)
-    for comment in submission.comments:
-        comments.add_missing_replies(comment)
+    comments.expand(submission.comments)
     return comments.deepest_node.id
 
 
@@ -159,7 +178,7 @@ def fetch_comments(comment, limit=None):
     """
     Fetch a chain of comments from root to the supplied leaf comment.
     """
-    tree = models.CommentTree([], reddit=reddit)
+    tree = models.CommentTree([], reddit=reddit, compact=True)
     comment_id = getattr(comment, "id", comment)
     comments = tree.comment(comment_id).walk_up_tree(limit=limit)[::-1]
     return [models.comment_to_dict(x) for x in comments]
@@ -0,0 +1,7 @@
+import os
+
+# Importing the reddit interface builds an authorised praw instance. It doesn't
+# talk to reddit until it's used, so a dummy token keeps the tests offline.
+os.environ.setdefault("praw_refresh_token", "test")
+os.environ["rcounting_cache"] = ""
+os.environ["rcounting_dfa_cache"] = ""
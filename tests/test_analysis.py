@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rcounting import analysis
+
+USERS = ["alice", "bob", "carol", "dave", "erin"]
+
+
+def write_csvs(directory, n_files=2):
+    rng = np.random.default_rng(0)
+    frames = []
+    for file_index in range(n_files):
+        start = 1000 * file_index
+        # Each file has its own set of counters, so the categories of the
+        # combined frame include users that aren't in every part of it
+        users = USERS[file_index : file_index + 3]
+        df = pd.DataFrame(
+            {
+                "username": rng.choice(users, 1000),
+                "timestamp": 1_500_000_000 + np.arange(start, start + 1000) * 7,
+                "comment_id": [f"c{x}" for x in range(start, start + 1000)],
+                "submission_id": [f"s{x // 250}" for x in range(start, start + 1000)],
+                "position": np.arange(start, start + 1000),
+            }
+        )
+        df.to_csv(directory / f"{start}.csv", index=False)
+        frames.append(df)
+    return pd.concat(frames).set_index("comment_id")
+
+
+@pytest.fixture
+def counts(tmp_path):
+    expected = write_csvs(tmp_path)
+    df = analysis.load_csvs(0, 2, tmp_path)
+    assert df["username"].dtype == "category"
+    assert df["timestamp"].dtype == "int64"
+    return df, expected
+
+
+def subset(df, users):
+    return df[df["username"].isin(users)].copy()
+
+
+def test_response_graph_matches_plain_strings(counts):
+    df, expected = counts
+    for frame in [subset(df, USERS[:3]), df]:
+        plain = frame.astype({"username": object})
+        result = analysis.response_graph(frame)
+        pd.testing.assert_frame_equal(
+            result.astype({"Source": object, "Target": object}), analysis.response_graph(plain)
+        )
+
+
+def test_even_odd_counts_match_plain_strings(counts):
+    df, _ = counts
+    frame = subset(df, USERS[:3])
+    result = analysis.even_odd_counts(frame.copy())
+    plain = analysis.even_odd_counts(frame.astype({"username": object}))
+    assert list(result.index) == list(plain.index)
+    np.testing.assert_array_equal(result.to_numpy(), plain.to_numpy())
+
+
+def test_capture_the_flag_score_matches_plain_strings(counts):
+    df, _ = counts
+    frame = subset(df, USERS[:2])
+    result = analysis.capture_the_flag_score(frame.copy())
+    plain = analysis.capture_the_flag_score(frame.astype({"username": object}))
+    assert list(result.index) == list(plain.index)
+    np.testing.assert_array_equal(result.to_numpy(), plain.to_numpy())
+
+
+def test_hoc_string_matches_plain_strings(counts):
+    df, _ = counts
+    frame = subset(df, USERS[:2]).reset_index()
+    plain = frame.astype({"username": object})
+    assert analysis.hoc_string(frame, "title") == analysis.hoc_string(plain, "title")
+
+
+def test_hoc_by_time_matches_plain_strings(counts):
+    plots = pytest.importorskip("rcounting.plots")
+    df, _ = counts
+    frame = subset(df, USERS[:3])
+    result = plots.hoc_by_time(frame.copy()).get_lines()
+    plain = plots.hoc_by_time(frame.astype({"username": object})).get_lines()
+    assert [x.get_label() for x in result] == [x.get_label() for x in plain]
+    for line, plain_line in zip(result, plain):
+        np.testing.assert_array_equal(line.get_ydata(), plain_line.get_ydata())
+
+
+def test_missing_timestamps_are_kept(tmp_path):
+    expected = write_csvs(tmp_path, n_files=1)
+    expected.iloc[3, expected.columns.get_loc("timestamp")] = np.nan
+    expected.reset_index().to_csv(tmp_path / "0.csv", index=False)
+    df = analysis.read_csv(tmp_path / "0.csv")
+    assert df["timestamp"].dtype == "Int64"
+    assert df["timestamp"].isna().sum() == 1
+    with pytest.raises(ValueError):
+        analysis.read_csv(tmp_path / "0.csv", strict=True)
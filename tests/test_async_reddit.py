@@ -0,0 +1,19 @@
+import asyncio
+
+from rcounting import async_reddit
+
+
+async def double_all(client, values):
+    return await client.map(lambda x: 2 * x, values)
+
+
+def test_run():
+    assert async_reddit.run(double_all, None, [1, 2, 3]) == [2, 4, 6]
+
+
+def test_run_inside_a_running_loop():
+    # This is what happens when the tools are used from a jupyter notebook
+    async def notebook_cell():
+        return async_reddit.run(double_all, None, [1, 2, 3])
+
+    assert asyncio.run(notebook_cell()) == [2, 4, 6]
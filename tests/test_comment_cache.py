@@ -0,0 +1,122 @@
+from types import SimpleNamespace
+
+import pytest
+
+from rcounting import comment_cache, models
+from rcounting import thread_navigation as tn
+from rcounting.comment_cache import ARCHIVE_AGE, COMMENT_TTL, LINK_TTL, REPLIES_TTL
+
+NOW = 2_000_000_000
+
+
+def make_comment(comment_id, parent_id=None, created_utc=NOW - 100):
+    return SimpleNamespace(
+        id=comment_id,
+        body=f"body of {comment_id}",
+        author="alice",
+        created_utc=created_utc,
+        link_id="t3_s",
+        parent_id=f"t1_{parent_id}" if parent_id is not None else "t3_s",
+        is_root=parent_id is None,
+    )
+
+
+CHAIN = [make_comment("a"), make_comment("b", "a"), make_comment("c", "b")]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=NOW)
+    monkeypatch.setattr(comment_cache, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return comment_cache.CommentCache(tmp_path / "cache.sqlite")
+
+
+def test_comments_expire(cache, clock):
+    assert cache.get("a") is None
+    cache.add(CHAIN)
+    cached = cache.get("b")
+    assert (cached.id, cached.parent_id, cached.body) == ("b", "t1_a", "body of b")
+    assert [x.id for x in cache.get_ancestors("c")] == ["c", "b", "a"]
+    clock.now += COMMENT_TTL + 1
+    assert cache.get("b") is None
+    assert cache.get_ancestors("c") == []
+
+
+def test_ancestors_stop_at_stale_comments(cache, clock):
+    cache.add(CHAIN[:1])
+    clock.now += COMMENT_TTL + 1
+    cache.add(CHAIN[1:])
+    assert [x.id for x in cache.get_ancestors("c")] == ["c", "b"]
+
+
+def test_archived_comments_never_expire(cache, clock):
+    old = make_comment("old", created_utc=NOW - ARCHIVE_AGE - 1)
+    cache.add([old])
+    clock.now += 100 * COMMENT_TTL
+    assert cache.get("old").id == "old"
+
+
+def test_replies_need_to_be_complete_and_fresh(cache, clock):
+    cache.add(CHAIN)
+    assert cache.get_replies("a") is None
+    cache.add(CHAIN, complete_replies=True)
+    assert [x.id for x in cache.get_replies("a")] == ["b", "c"]
+    # Adding the comment again without its replies doesn't forget that they're known
+    cache.add(CHAIN[:1])
+    assert [x.id for x in cache.get_replies("a")] == ["b", "c"]
+    clock.now += REPLIES_TTL + 1
+    assert cache.get_replies("a") is None
+    assert cache.get("a") is not None
+
+
+def test_tree_uses_cached_replies(cache):
+    def offline(*args, **kwargs):
+        raise AssertionError("went to reddit")
+
+    reddit = SimpleNamespace(comment=offline, get=offline, info=offline)
+    cache.add(CHAIN, complete_replies=True)
+    tree = models.CommentTree(reddit=reddit, cache=cache)
+    replies = tree.add_missing_replies("a")
+    assert [x.id for x in replies] == ["b", "c"]
+    assert [x.id for x in tree.walk_up_tree("c")] == ["c", "b", "a"]
+
+
+def test_links_expire_unless_they_point_to_a_get(cache, clock):
+    submission = SimpleNamespace(id="s2", title="2000", created_utc=NOW - 100)
+    cache.add_link(submission, ("s1", None), [])
+    assert cache.get_link("s2") == ("s1", None)
+    clock.now += LINK_TTL + 1
+    assert cache.get_link("s2") is None
+    cache.add_link(submission, ("s1", "g1"), [])
+    clock.now += 100 * LINK_TTL
+    assert cache.get_link("s2") == ("s1", "g1")
+
+
+def test_previous_submissions_are_resolved_once(monkeypatch, cache, clock):
+    links = {"s2": ("s1", "g1"), "s3": ("s2", None)}
+    resolved = []
+
+    def resolve(submission, similarity_threshold):
+        resolved.append(submission.id)
+        return links[submission.id], []
+
+    monkeypatch.setattr(comment_cache, "default_cache", lambda: cache)
+    monkeypatch.setattr(tn, "resolve_previous_submission", resolve)
+    submissions = {
+        x: SimpleNamespace(id=x, title=f"{x} | 1000", created_utc=NOW - 100) for x in links
+    }
+    monkeypatch.setattr(tn, "reddit", SimpleNamespace(submission=submissions.get))
+    for _ in range(2):
+        assert tn.find_previous_submission(submissions["s2"]) == ("s1", "g1")
+        assert tn.find_previous_submission("s3") == ("s2", None)
+    assert resolved == ["s2", "s3"]
+    # A link without a get might still be improved on, so it's checked again later
+    clock.now += LINK_TTL + 1
+    tn.find_previous_submission(submissions["s2"])
+    tn.find_previous_submission(submissions["s3"])
+    assert resolved == ["s2", "s3", "s3"]
@@ -0,0 +1,111 @@
+import random
+
+import pytest
+
+from rcounting.side_threads import dfa
+
+
+def no_repeating_digits():
+    return dfa.DFAType(dfa=dfa.compressed_dfa, indices=dfa.no_repeating)
+
+
+def no_successive_digits():
+    return dfa.DFAType(dfa=dfa.LastDigitDFA(), indices=dfa.no_successive)
+
+
+def brute_force(is_valid, n):
+    """The count of every valid number up to n, found by checking each one"""
+    result = []
+    total = 0
+    for i in range(1, n + 1):
+        total += is_valid(str(i))
+        result.append(total)
+    return result
+
+
+@pytest.mark.parametrize(
+    "make_type, is_valid",
+    [
+        (no_repeating_digits, lambda x: len(set(x)) == len(x)),
+        (no_successive_digits, lambda x: all(a != b for a, b in zip(x, x[1:]))),
+    ],
+)
+def test_counts_match_brute_force(make_type, is_valid):
+    comment_type = make_type()
+    expected = brute_force(is_valid, 3000)
+    # Consecutive words share their prefixes, which the cache makes use of
+    assert [comment_type.word_to_count(str(i)) for i in range(1, 3001)] == expected
+
+
+def test_prefix_cache_doesnt_change_counts():
+    rng = random.Random(0)
+    words = [str(x) for x in rng.sample(range(10**9), 100)]
+    words += [str(int(x) + i) for x in words[:10] for i in range(1, 20)]
+    expected = {word: no_repeating_digits().word_to_count(word) for word in words}
+    cached = no_repeating_digits()
+    cached.prefix_cache_size = 50
+    for order in [sorted(words, key=int), rng.sample(words, len(words))]:
+        assert {word: cached.word_to_count(word) for word in order} == expected
+    assert len(cached.prefix_totals) <= 50
+
+
+@pytest.fixture
+def cache_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("rcounting_dfa_cache", str(tmp_path))
+    return tmp_path
+
+
+def test_tables_are_stored_on_disk(cache_directory):
+    word = "9876543210"
+    comment_type = no_repeating_digits()
+    expected = comment_type.word_to_count(word)
+    (path,) = cache_directory.glob("*.npy")
+    assert path == comment_type.cache_path
+    assert path.name.startswith(f"v{dfa.DFA_CACHE_VERSION}-")
+
+    loaded = no_repeating_digits()
+    assert len(loaded.load_matrices()) == len(comment_type.matrices)
+    assert loaded.word_to_count(word) == expected
+    # Tables for other indices are stored separately
+    other = dfa.DFAType(dfa=dfa.compressed_dfa, indices=dfa.only_repeating)
+    assert other.cache_path != path
+
+
+def test_tables_are_extended(cache_directory):
+    comment_type = no_repeating_digits()
+    comment_type.word_to_count("12")
+    short = len(comment_type.matrices)
+    expected = no_repeating_digits().word_to_count("123456789")
+    extended = no_repeating_digits()
+    assert len(extended.load_matrices()) > short
+    assert extended.word_to_count("123456789") == expected
+
+
+def test_unreadable_tables_are_ignored(cache_directory):
+    comment_type = no_repeating_digits()
+    comment_type.cache_path.write_bytes(b"not a numpy file")
+    expected = brute_force(lambda x: len(set(x)) == len(x), 1234)[-1]
+    assert comment_type.word_to_count("1234") == expected
+    # The unreadable file has been replaced by a good one
+    assert no_repeating_digits().word_to_count("1234") == expected
+
+
+@pytest.mark.parametrize("length", [2, 5, 25, 40])
+def test_long_words_are_counted_exactly(length):
+    # Every number with at most `length` digits and no two equal digits in a row
+    expected = sum(9**k for k in range(1, length + 1))
+    comment_type = no_successive_digits()
+    count = comment_type.word_to_count("1" + "0" * length)
+    assert count == expected
+    assert isinstance(count, int)
+    assert bool(comment_type.exact_matrices) == (expected > dfa.INT64_MAX)
+
+
+def test_only_int64_tables_are_stored(cache_directory):
+    word = "1" + "0" * 40
+    expected = no_successive_digits().word_to_count(word)
+    loaded = no_successive_digits()
+    tables = loaded.load_matrices()
+    assert tables.dtype == "int64"
+    assert tables.max() <= loaded.int_limit
+    assert loaded.word_to_count(word) == expected
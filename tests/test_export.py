@@ -0,0 +1,63 @@
+import pytest
+from click.testing import CliRunner
+
+from rcounting import analysis, io
+
+pytest.importorskip("pyarrow")
+
+YEAR = 365 * 24 * 3600
+
+
+def make_database(path):
+    db = io.connect(path, is_main=False)
+    submissions = [
+        ("s1", "alice", 0, "1000 | a", "body", "t1"),
+        ("s2", "bob", YEAR, "2000 | b", "body", "t2"),
+    ]
+    comments = [
+        (position, f"c{position}", submission_id, ["alice", "bob"][position % 2], timestamp)
+        for position, (submission_id, timestamp) in enumerate(
+            [("s1", 10)] * 5 + [("s2", YEAR + 10)] * 4
+        )
+    ]
+    with db:
+        db.executemany(
+            "INSERT INTO submissions (submission_id, username, timestamp, title, body, thread_id) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            submissions,
+        )
+        db.executemany(
+            "INSERT INTO comments (position, comment_id, submission_id, username, timestamp, body) "
+            "VALUES (?, ?, ?, ?, ?, 'count')",
+            comments,
+        )
+    db.close()
+
+
+def test_export_command_writes_partitioned_parquet(tmp_path, monkeypatch):
+    # Importing the CLI creates a scratch database in the working directory
+    monkeypatch.chdir(tmp_path)
+    from rcounting.scripts.cli import cli
+
+    path = tmp_path / "counting.sqlite"
+    make_database(path)
+    output = tmp_path / "out"
+    result = CliRunner().invoke(cli, ["export", "-f", str(path), "-o", str(output)])
+    assert result.exit_code == 0, result.output
+
+    comments = analysis.load_parquet(output)
+    assert sorted(comments["comment_id"]) == [f"c{x}" for x in range(9)]
+    assert comments["username"].dtype == "category"
+    assert set(zip(comments["thread_id"], comments["year"])) == {("t1", 1970), ("t2", 1971)}
+    assert len(analysis.load_parquet(output, thread_ids=["t2"])) == 4
+    assert len(analysis.load_parquet(output, table="submissions")) == 2
+
+
+def test_export_overwrites_previous_export(tmp_path):
+    path = tmp_path / "counting.sqlite"
+    make_database(path)
+    db = io.connect(path, is_main=False)
+    output = tmp_path / "out"
+    io.export_parquet(db, output, chunksize=2)
+    io.export_parquet(db, output, chunksize=4)
+    assert len(analysis.load_parquet(output)) == 9
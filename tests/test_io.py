@@ -0,0 +1,44 @@
+import pytest
+
+from rcounting import io
+
+
+def make_database(path):
+    db = io.connect(path, is_main=False)
+    with db:
+        db.executemany(
+            "INSERT INTO submissions (submission_id, username, timestamp, title, body, thread_id) "
+            "VALUES (?, 'alice', ?, 'title', 'body', ?)",
+            [("s1", 1, "a"), ("s2", 2, "b"), ("s3", 3, "d")],
+        )
+        db.executemany(
+            "INSERT INTO checkpoints (thread_id, submission_id, timestamp, comment_id) "
+            "VALUES (?, ?, ?, NULL)",
+            [("a", "s1", 1), ("b", "s2", 2)],
+        )
+    return db
+
+
+def thread_ids(db, table):
+    return sorted(x[0] for x in db.execute(f"SELECT thread_id FROM {table}"))
+
+
+@pytest.mark.parametrize("relabels", [{"a": "b", "b": "c"}, {"b": "c", "a": "b"}])
+def test_chained_relabels_follow_the_chain(tmp_path, relabels):
+    db = make_database(tmp_path / "counting.sqlite")
+    io.relabel_threads(db, relabels)
+    assert thread_ids(db, "submissions") == ["c", "c", "d"]
+    assert thread_ids(db, "checkpoints") == ["c"]
+
+
+def test_final_relabels():
+    assert io.final_relabels({"a": "b", "b": "c", "c": "c"}) == {"a": "c", "b": "c"}
+    with pytest.raises(ValueError):
+        io.final_relabels({"a": "b", "b": "a"})
+
+
+def test_circular_relabels_change_nothing(tmp_path):
+    db = make_database(tmp_path / "counting.sqlite")
+    with pytest.raises(ValueError):
+        io.relabel_threads(db, {"a": "b", "b": "a"})
+    assert thread_ids(db, "submissions") == ["a", "b", "d"]
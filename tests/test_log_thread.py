@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import pytest
+
+from rcounting import io, reddit_interface
+from rcounting import thread_navigation as tn
+from rcounting.scripts.log_thread import log_undecorated
+
+# Three submissions in a chain, s1 <- s2 <- s3, with gets g1, g2 and g3
+GETS = {"g1": "s1", "g2": "s2", "g3": "s3", "stale": "s3"}
+
+
+def submission(submission_id):
+    return SimpleNamespace(
+        id=submission_id,
+        title=f"{submission_id} | title",
+        author="alice",
+        created_utc=int(submission_id[1:]),
+        selftext="",
+    )
+
+
+def comment(comment_id):
+    return SimpleNamespace(id=comment_id, submission=submission(GETS[comment_id]))
+
+
+def fetch_comments(leaf):
+    submission_id = leaf.submission.id
+    return [
+        {
+            "username": "bob",
+            "timestamp": ix,
+            "comment_id": f"{submission_id}-{ix}",
+            "submission_id": submission_id,
+            "body": str(ix),
+        }
+        for ix in range(3)
+    ] + [
+        {
+            "username": "bob",
+            "timestamp": 3,
+            "comment_id": leaf.id,
+            "submission_id": submission_id,
+            "body": "3",
+        }
+    ]
+
+
+def unexpected(*args, **kwargs):
+    raise AssertionError("The journal should have made this call unnecessary")
+
+
+@pytest.fixture
+def fake_reddit(monkeypatch):
+    reddit = SimpleNamespace(comment=comment, submission=submission)
+    monkeypatch.setattr(reddit_interface, "reddit", reddit)
+    monkeypatch.setattr(tn, "fetch_comments", fetch_comments)
+    monkeypatch.setattr(tn, "find_previous_submission", unexpected)
+    monkeypatch.setattr(tn, "find_get_in_submission", unexpected)
+
+
+def log(path):
+    log_undecorated(
+        "g3", False, 2, path, True, 0, True, first_submissions=["s1"], side_thread_id="t"
+    )
+
+
+def logged_comments(path):
+    db = io.connect(path, is_main=False)
+    return [x[0] for x in db.execute("SELECT comment_id FROM comments ORDER BY rowid")]
+
+
+def test_resume_uses_the_journal(tmp_path, fake_reddit):
+    path = tmp_path / "counting.sqlite"
+    journal = io.WorkJournal(io.connect(path, is_main=False), "t")
+    # A stale get for the first submission must not replace the requested comment
+    journal.record("s3", get_id="stale", previous_submission_id="s2", previous_get_id="g2")
+    journal.record("s2", get_id="g2", previous_submission_id="s1", previous_get_id="g1")
+
+    log(path)
+
+    assert logged_comments(path)[3] == "g3"
+    assert logged_comments(path)[7] == "g2"
+    assert io.WorkJournal(io.connect(path, is_main=False), "t").get("s3") is None
+
+
+def test_fetched_comments_are_written_when_a_run_fails(tmp_path, fake_reddit, monkeypatch):
+    path = tmp_path / "counting.sqlite"
+    journal = io.WorkJournal(io.connect(path, is_main=False), "t")
+    journal.record("s3", previous_submission_id="s2", previous_get_id="g2")
+    journal.record("s2", get_id="g2")
+
+    def fail_on_s2(leaf):
+        if leaf.submission.id == "s2":
+            raise RuntimeError("Connection lost")
+        return fetch_comments(leaf)
+
+    monkeypatch.setattr(tn, "fetch_comments", fail_on_s2)
+    with pytest.raises(RuntimeError):
+        log(path)
+
+    assert logged_comments(path) == [f"s3-{x}" for x in range(3)] + ["g3"]
+    assert io.WorkJournal(io.connect(path, is_main=False), "t").get("s3") is not None
@@ -0,0 +1,166 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from rcounting import models
+
+
+def make_comment(comment_id, parent_id=None, submission_id="s", created_utc=0, author="alice"):
+    return SimpleNamespace(
+        id=comment_id,
+        body=f"body of {comment_id}",
+        author=author,
+        created_utc=created_utc,
+        link_id=f"t3_{submission_id}",
+        parent_id=f"t1_{parent_id}" if parent_id is not None else f"t3_{submission_id}",
+        is_root=parent_id is None,
+    )
+
+
+# a - b - c - d
+#      \
+#       e - f
+COMMENTS = [
+    make_comment("a", created_utc=0),
+    make_comment("b", "a", created_utc=1, author="bob"),
+    make_comment("c", "b", created_utc=2),
+    make_comment("d", "c", created_utc=3, author="bob"),
+    make_comment("e", "b", created_utc=4, author="carol"),
+    make_comment("f", "e", created_utc=5),
+]
+FIELDS = ["id", "body", "author", "created_utc", "link_id", "parent_id", "is_root", "removed"]
+
+
+def fields(comment):
+    return tuple(getattr(comment, field) for field in FIELDS)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_comments_are_views(compact):
+    tree = models.CommentTree(COMMENTS, compact=compact)
+    comments = sorted(tree.comments, key=lambda x: x.id)
+    assert all(isinstance(x, models.Comment) for x in comments)
+    assert [fields(x) for x in comments] == [fields(models.Comment(x, tree)) for x in COMMENTS]
+    assert [x.depth for x in comments] == [1, 2, 3, 4, 3, 4]
+
+
+def test_compact_comments_have_a_reddit_comment():
+    assert models.CommentTree(COMMENTS).comment("c").comment is COMMENTS[2]
+    assert models.CommentTree(COMMENTS, compact=True).comment("c").comment is None
+    reddit = SimpleNamespace(comment=lambda comment_id: f"praw comment {comment_id}")
+    tree = models.CommentTree(COMMENTS, reddit=reddit, compact=True)
+    assert tree.comment("c").comment == "praw comment c"
+
+
+def make_random_tree(seed, size=60):
+    """The nodes and child -> parent edges of a random forest"""
+    rng = random.Random(seed)
+    nodes = {f"n{i}": SimpleNamespace(id=f"n{i}") for i in range(size)}
+    edges = {}
+    for i in range(1, size):
+        if rng.random() < 0.9:
+            edges[f"n{i}"] = f"n{rng.randrange(i)}"
+    return rng, nodes, edges
+
+
+def check_indices(tree):
+    """Compare the incrementally maintained indices with ones built from scratch"""
+    children = models.edges_to_tree([(parent, child) for child, parent in tree.tree.items()])
+    assert {k: sorted(v) for k, v in tree.reversed_tree.items()} == {
+        k: sorted(v) for k, v in children.items()
+    }
+
+    def depth(node_id):
+        # A node whose parent isn't in the tree is a root
+        result = 1
+        while tree.tree.get(node_id) in tree.nodes:
+            node_id = tree.tree[node_id]
+            result += 1
+        return result
+
+    depths = {node_id: depth(node_id) for node_id in tree.nodes}
+    assert {node_id: tree.find_depth(node_id) for node_id in tree.nodes} == depths
+    assert {x.id for x in tree.leaves} == set(tree.nodes) - set(tree.reversed_tree)
+    if depths:
+        assert tree.find_depth(tree.deepest_node) == max(depths.values())
+    else:
+        assert tree.deepest_node is None
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_indices_follow_additions(seed):
+    rng, nodes, edges = make_random_tree(seed)
+    tree = models.Tree({}, {})
+    # Adding nodes in a random order means children often arrive before their parents
+    order = list(nodes)
+    rng.shuffle(order)
+    for i in range(0, len(order), 7):
+        batch = order[i : i + 7]
+        tree.add_nodes({x: nodes[x] for x in batch}, {x: edges[x] for x in batch if x in edges})
+        check_indices(tree)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_indices_follow_deletions(seed):
+    rng, nodes, edges = make_random_tree(seed)
+    tree = models.Tree(dict(nodes), dict(edges))
+    check_indices(tree)
+    while tree.nodes:
+        node_id = rng.choice(sorted(tree.nodes))
+        action = rng.choice(["node", "subtree", "edge"])
+        if action == "node":
+            tree.delete_node(node_id)
+        elif action == "subtree":
+            tree.delete_subtree(tree.node(node_id))
+        elif node_id in tree.tree:
+            tree.delete_edge(node_id, tree.tree[node_id])
+        else:
+            continue
+        check_indices(tree)
+
+
+def test_deepest_node_and_leaves():
+    tree = models.CommentTree(COMMENTS)
+    assert tree.deepest_node.id in {"d", "f"}
+    assert sorted(x.id for x in tree.leaves) == ["d", "f"]
+    tree.delete_subtree(tree.comment("c"))
+    assert tree.deepest_node.id == "f"
+    tree.delete_node("f")
+    assert tree.deepest_node.id == "e"
+    assert sorted(x.id for x in tree.leaves) == ["e"]
+    assert tree.walk_down_tree("a")[-1].id == "e"
+
+
+def test_comment_store():
+    # Adding a reply reserves a slot for its parent without adding it
+    store = models.CommentStore([COMMENTS[2]])
+    assert len(store) == 1
+    assert set(store) == {"c"}
+    assert "b" not in store
+    assert "b" in store.slots
+    store.update({x.id: x for x in COMMENTS})
+    assert len(store) == len(COMMENTS)
+    assert store.authors == ["alice", "bob", "carol"]
+    assert store.submissions == ["s"]
+    del store["d"]
+    assert "d" not in store
+    assert sorted(store.keys()) == ["a", "b", "c", "e", "f"]
+    with pytest.raises(KeyError):
+        store["d"]
+    store.add(COMMENTS[3])
+    assert len(store) == len(COMMENTS)
+    assert store.bodies[store["d"]] == "body of d"
+
+
+def test_compact_tree_matches_normal_tree():
+    trees = [models.CommentTree(COMMENTS, compact=compact) for compact in [False, True]]
+    for tree in trees:
+        tree.delete_subtree(tree.comment("e"))
+        tree.add_comments([make_comment("g", "d", created_utc=6)])
+    normal, compact = trees
+    assert [fields(x) for x in normal.walk_up_tree("g")] == [
+        fields(x) for x in compact.walk_up_tree("g")
+    ]
+    assert sorted(normal.nodes) == sorted(compact.nodes)
+    assert normal.deepest_node.id == compact.deepest_node.id == "g"
@@ -0,0 +1,64 @@
+import prawcore
+import requests
+
+from rcounting.rate_limit import RateLimiter
+
+
+class FakeHttp:
+    """A stand-in for a requests session, recording the requests made through it"""
+
+    def __init__(self):
+        self.calls = []
+        self.headers = {}
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"kind": "t2"}'
+        response.headers.update({"x-ratelimit-remaining": "50", "x-ratelimit-reset": "100"})
+        return response
+
+    def close(self):
+        pass
+
+
+def make_session(limiter):
+    http = FakeHttp()
+    requestor = prawcore.Requestor("rcounting tests", session=http)
+    authenticator = prawcore.UntrustedAuthenticator(requestor, "client_id")
+    authorizer = prawcore.ImplicitAuthorizer(authenticator, "token", 3600, "*")
+    session = prawcore.Session(authorizer)
+    session._rate_limiter = limiter
+    return session, http
+
+
+def test_limiter_works_inside_a_prawcore_session():
+    limiter = RateLimiter()
+    session, http = make_session(limiter)
+    assert session.request("GET", "/api/v1/me") == {"kind": "t2"}
+    method, url, kwargs = http.calls[0]
+    assert method == "GET"
+    assert url.endswith("/api/v1/me")
+    assert kwargs["headers"]["Authorization"] == "bearer token"
+    assert limiter.requests == 1
+    assert limiter.rate == 0.5
+
+
+def test_limiter_accepts_prawcore_positional_order():
+    limiter = RateLimiter()
+    http = FakeHttp()
+    limiter.call(http.request, lambda: {"a": "b"}, "GET", "https://example.com", params={})
+    assert http.calls == [("GET", "https://example.com", {"params": {}, "headers": {"a": "b"}})]
+
+
+def test_limiter_accepts_keyword_order():
+    limiter = RateLimiter()
+    http = FakeHttp()
+    limiter.call(
+        method="POST",
+        request_function=http.request,
+        set_header_callback=dict,
+        url="https://example.com",
+    )
+    assert http.calls == [("POST", "https://example.com", {"headers": {}})]
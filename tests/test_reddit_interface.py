@@ -0,0 +1,44 @@
+import pytest
+
+from rcounting import async_reddit, reddit_interface
+
+
+@pytest.fixture
+def resolved(monkeypatch):
+    calls = []
+
+    def fake_resolve(url):
+        calls.append(url)
+        return url.upper(), None
+
+    monkeypatch.setattr(reddit_interface, "_resolve_short_link", fake_resolve)
+    monkeypatch.setattr(reddit_interface, "_short_links", {})
+    return calls
+
+
+@pytest.fixture
+def no_event_loop(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("started an event loop")
+
+    monkeypatch.setattr(async_reddit, "run", fail)
+
+
+def test_few_links_are_resolved_directly(resolved, no_event_loop):
+    assert reddit_interface.resolve_short_links(["a", "b", "a"]) == {
+        "a": ("A", None),
+        "b": ("B", None),
+    }
+    assert resolved == ["a", "b"]
+
+
+def test_links_are_only_resolved_once(resolved, no_event_loop):
+    reddit_interface.extract_from_short_link("a")
+    assert reddit_interface.extract_from_short_link("a") == ("A", None)
+    assert resolved == ["a"]
+
+
+def test_batches_are_resolved_concurrently(resolved):
+    urls = ["a", "b", "c", "d"]
+    assert reddit_interface.resolve_short_links(urls) == {x: (x.upper(), None) for x in urls}
+    assert sorted(resolved) == urls
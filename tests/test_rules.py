@@ -0,0 +1,174 @@
+import random
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from rcounting import models
+from rcounting.side_threads.forms import CommentType
+from rcounting.side_threads.rules import CountingRule, FastOrSlow, OnlyDoubleCounting
+from rcounting.side_threads.side_threads import SideThread
+from rcounting.side_threads.validate_form import base_n
+from rcounting.units import HOUR, MINUTE
+
+USERS = ["alice", "bob", "carol", "dave"]
+GAPS = [1, 30, 2 * MINUTE, 10 * MINUTE, 2 * HOUR]
+RULES = {
+    "default": CountingRule(),
+    "wait 2": CountingRule(wait_n=2),
+    "wait 0": CountingRule(wait_n=0),
+    "no repeats": CountingRule(wait_n=None),
+    "thread time": CountingRule(thread_time=MINUTE),
+    "user time": CountingRule(wait_n=0, user_time=HOUR),
+    "everything": CountingRule(wait_n=2, thread_time=5 * MINUTE, user_time=HOUR),
+    "fast or slow": FastOrSlow(),
+}
+
+
+def make_comments(seed, n=80, users=USERS):
+    rng = random.Random(seed)
+    timestamp = 0
+    comments = []
+    for i in range(n):
+        timestamp += rng.choice(GAPS)
+        comments.append(
+            SimpleNamespace(
+                id=f"c{i}", author=rng.choice(users), created_utc=timestamp, body=str(i)
+            )
+        )
+    return comments
+
+
+def to_history(comments):
+    return pd.DataFrame(
+        {
+            "comment_id": [x.id for x in comments],
+            "username": [x.author for x in comments],
+            "timestamp": [x.created_utc for x in comments],
+        }
+    )
+
+
+def stream(rule, comments, history=None):
+    """Validate `comments` one at a time, starting from the state of `history`"""
+    state = rule.initial_state(to_history(history or []))
+    result = []
+    for comment in comments:
+        is_valid, state = rule.advance(state, comment)
+        result.append(is_valid)
+    return result
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("name", RULES)
+def test_streaming_matches_whole_history(name, seed):
+    rule = RULES[name]
+    comments = make_comments(seed)
+    assert stream(rule, comments) == list(rule.is_valid(to_history(comments)))
+
+
+@pytest.mark.parametrize("name", RULES)
+def test_streaming_from_a_known_history(name):
+    rule = RULES[name]
+    comments = make_comments(0)
+    expected = list(rule.is_valid(to_history(comments)))
+    for split in [1, 5, 40]:
+        assert stream(rule, comments[split:], comments[:split]) == expected[split:]
+
+
+def test_only_double_counting():
+    rule = OnlyDoubleCounting()
+    comments = [SimpleNamespace(author=x, created_utc=0) for x in "aabbccc"]
+    assert stream(rule, comments) == [True, True, True, True, True, True, False]
+    assert stream(rule, [SimpleNamespace(author="b", created_utc=0)] * 2) == [True, True]
+    # Without knowing where a run started, a single count might be the end of a pair
+    history = [SimpleNamespace(id="x", author="a", created_utc=0)]
+    assert stream(rule, comments[2:4], history) == [True, True]
+    assert stream(rule, comments[:1], history) == [True]
+    assert stream(rule, comments[:2], history + history) == [False, False]
+
+
+def test_side_thread_checks_the_count_and_the_user():
+    side_thread = SideThread(CommentType(form=base_n(10)), rule=CountingRule())
+    state = side_thread.rule.initial_state(to_history([]))
+    comment = SimpleNamespace(author="alice", created_utc=0, body="1000")
+    is_valid, state = side_thread.is_valid_count(comment, state)
+    assert is_valid
+    assert not side_thread.is_valid_count(comment, state)[0]
+    for body, author in [("not a count", "bob"), ("1001", "LuckyNumber-Bot")]:
+        comment = SimpleNamespace(author=author, created_utc=0, body=body)
+        assert not side_thread.is_valid_count(comment, state)[0]
+
+
+@pytest.mark.parametrize("name", ["default", "wait 2", "thread time", "user time"])
+def test_state_only_keeps_the_look_back(name):
+    rule = RULES[name]
+    count, max_time = rule.lookback
+    # Comments are at least a second apart, so this is the most a rule can need
+    needed = count + max_time + 1
+    state = rule.initial_state(to_history([]))
+    longest = 0
+    for comment in make_comments(0, n=2000):
+        _, state = rule.advance(state, comment)
+        longest = max(longest, sum(1 for _ in state))
+    assert longest <= 2 * needed + 8
+
+
+def make_tree_comments(seed, n=150):
+    """A random comment tree, where most comments reply to one of the latest few"""
+    rng = random.Random(seed)
+    comments = []
+    for i in range(n):
+        parent = comments[-rng.randint(1, min(4, i))] if i and rng.random() < 0.95 else None
+        timestamp = (parent.created_utc if parent else 0) + rng.choice(GAPS)
+        comments.append(
+            SimpleNamespace(
+                id=f"c{i}",
+                author=rng.choice(USERS),
+                created_utc=timestamp,
+                body=str(i),
+                link_id="t3_s",
+                parent_id=f"t1_{parent.id}" if parent else "t3_s",
+                is_root=parent is None,
+            )
+        )
+    return comments
+
+
+def expected_survivors(rule, comments):
+    """The comments whose whole chain from the root is valid, checked one chain at a time"""
+    by_id = {x.id: x for x in comments}
+    survivors = set()
+    for comment in comments:
+        chain = [comment]
+        while not chain[-1].is_root:
+            chain.append(by_id[chain[-1].parent_id[3:]])
+        if rule.is_valid(to_history(chain[::-1])).all():
+            survivors.add(comment.id)
+    return survivors
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("name", ["default", "wait 2", "no repeats", "user time", "everything"])
+def test_prune(name, seed):
+    rule = RULES[name]
+    comments = make_tree_comments(seed)
+    tree = models.CommentTree(comments)
+    tree.prune(SideThread(rule=rule))
+    assert set(tree.nodes) == expected_survivors(rule, comments)
+
+
+def test_history_covers_the_look_back():
+    comments = make_comments(0)
+    for previous, comment in zip(comments, comments[1:]):
+        comment.parent_id = f"t1_{previous.id}"
+        comment.is_root = False
+        comment.link_id = "t3_s"
+    comments[0].is_root, comments[0].link_id = True, "t3_s"
+    comments[0].parent_id = "t3_s"
+    tree = models.CommentTree(comments)
+    leaf = tree.comment(comments[-1].id)
+    assert len(RULES["wait 2"].get_history(leaf)) == 2
+    history = RULES["user time"].get_history(leaf)
+    assert history["timestamp"].iloc[0] <= leaf.created_utc - HOUR
+    assert len(history) < len(comments) - 1
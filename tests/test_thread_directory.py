@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import pytest
+
+from rcounting import models
+from rcounting import thread_directory as td
+
+# Side threads with base 10 counts, identified by their first submission
+THREADS = {
+    "uuikz": "decimal",
+    "633cb2": "no repeating digits",
+    "8hjhqj": "only repeating digits",
+    "5zzvnf": "slow",
+    "4sx7th": "permutations",
+}
+USERS = ["alice", "bob", "carol"]
+
+
+def make_submission(submission_id, title, n_comments=6):
+    """A submission with a single chain of counts, and a broken branch off it"""
+    comments = []
+    parent_id = f"t3_{submission_id}"
+    for i in range(n_comments):
+        comment = SimpleNamespace(
+            id=f"{submission_id}_{i}",
+            body=str(1000 + i),
+            author=USERS[i % len(USERS)],
+            created_utc=3600 * i,
+            link_id=f"t3_{submission_id}",
+            parent_id=parent_id,
+            is_root=i == 0,
+        )
+        comments.append(comment)
+        parent_id = f"t1_{comment.id}"
+    # A reply by the same user as its parent, posted before the valid one
+    invalid = SimpleNamespace(
+        id=f"{submission_id}_x",
+        body="1003",
+        author=comments[2].author,
+        created_utc=comments[3].created_utc - 1,
+        link_id=f"t3_{submission_id}",
+        parent_id=f"t1_{comments[2].id}",
+        is_root=False,
+    )
+    comments.append(invalid)
+    return SimpleNamespace(id=submission_id, title=title, comments=comments)
+
+
+@pytest.fixture
+def directory(monkeypatch):
+    submissions = {}
+    edges = {}
+    rows = []
+    for i, (first_submission, name) in enumerate(THREADS.items()):
+        submissions[first_submission] = make_submission(first_submission, f"{name} | 1000")
+        # Every other thread has had a new submission since the last update
+        if i % 2:
+            new_id = f"{first_submission}b"
+            submissions[new_id] = make_submission(new_id, f"{name} | 2000")
+            edges[new_id] = first_submission
+        rows.append(
+            (name, first_submission, "1000", first_submission, f"{first_submission}_0", "1,000")
+        )
+    comments = {
+        x.id: submission for submission in submissions.values() for x in submission.comments
+    }
+
+    def add_missing_replies(self, comment, limit=None):
+        self.add_comments(comments[models.extract_id(comment)].comments)
+        return []
+
+    monkeypatch.setattr(models.CommentTree, "add_missing_replies", add_missing_replies)
+    tree = models.SubmissionTree(submissions, edges)
+
+    def make_directory():
+        paragraphs = [["text", "# Directory"], ["table", list(rows)], ["text", "footer"]]
+        return td.Directory(paragraphs, allow_archive=False)
+
+    return tree, make_directory
+
+
+def updated_rows(directory, workers):
+    tree, make_directory = directory
+    result = make_directory()
+    result.update_existing_rows(tree, workers=workers)
+    return [(str(row), row.count, row.starred_count) for row in result.rows]
+
+
+def test_rows_skip_invalid_comments(directory):
+    rows = updated_rows(directory, workers=1)
+    assert not any("_x" in row for row, _, _ in rows)
+    assert "/comments/633cb2b/_/633cb2b_3" in rows[1][0]
+
+
+def test_parallel_update_matches_serial_update(directory):
+    assert updated_rows(directory, workers=4) == updated_rows(directory, workers=1)